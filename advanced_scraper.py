@@ -3,10 +3,16 @@ import time
 import os
 import json
 import csv
+import tempfile
+from collections.abc import Mapping
 from pathlib import Path
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from profile_cache import profile_cache, cache_key
+from history_journal import open_journal
+from excel_export import write_excel, write_excel_streaming
+from export_watermark import watermark_for
+from export_pipeline import export_rows, union_keys
+from profile_record import ProfileRecord, render_profile, render_count
 
 # Ensure UTF-8 encoding for proper Arabic text display
 import sys
@@ -25,17 +31,14 @@ class InstagramInfoScraper:
         self.search_history_file = self.output_dir / "search_history.json"
         self.loader = None
         self.current_user = None
+        self.history_journal = open_journal(self.search_history_file)
         self.search_history = self.load_search_history()
+        self.last_export_rows = 0  # Rows written by the latest export_search_history_* call
+        self._cache = profile_cache
         
     def load_search_history(self):
         """Load previous search history from file"""
-        if self.search_history_file.exists():
-            try:
-                with open(self.search_history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        return self.history_journal.data
         
     def create_loader(self):
         """Create Instaloader instance with optimized settings"""
@@ -79,6 +82,10 @@ class InstagramInfoScraper:
     
     def get_user_info(self, username, retries=5, delay=10):
         """Fetch detailed user information"""
+        cached = self._cache.get(cache_key("instagram", username, "advanced"))
+        if cached:
+            return cached
+        
         if not self.loader:
             self.loader = self.create_loader()
         
@@ -101,33 +108,33 @@ class InstagramInfoScraper:
                 full_location = f"{city}, {country}" if city != "Not available" and country != "Not available" else city if city != "Not available" else country
                 
                 # Count name changes
-                name_changes = "Not available"
+                name_changes = None  # Left unset in the record unless known
                 if hasattr(profile, 'name_changes') and profile.name_changes:
                     name_changes = len(profile.name_changes)
                 
-                data = {
+                data = ProfileRecord({
                     "username": profile.username,
                     "full_name": profile.full_name,
-                    "followers": f"{profile.followers:,}",
-                    "following": f"{profile.followees:,}",
+                    "followers": profile.followers,
+                    "following": profile.followees,
                     "bio": profile.biography if profile.biography else "No bio set",
                     "city": city,
                     "country": country,
                     "full_location": full_location,
                     "posts_count": profile.mediacount,
                     "name_changes": name_changes,
-                    "is_business_account": "✅ Yes" if profile.is_business_account else "❌ No",
-                    "is_verified": "✅ Yes" if profile.is_verified else "❌ No",
-                    "is_public": "🌐 Yes" if not profile.is_private else "🔒 No",
+                    "is_business_account": profile.is_business_account,
+                    "is_verified": profile.is_verified,
+                    "is_public": not profile.is_private,
                     "external_url": profile.external_url if profile.external_url else "Not set",
                     "profile_pic_url": profile.profile_pic_url,
                     "biography_html": profile.biography_html if hasattr(profile, 'biography_html') else "Not available",
                     "search_timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
+                })
                 
                 # Save to search history
-                self.search_history[username.lower()] = data
-                self.save_search_history()
+                self.record_search(username.lower(), data)
+                self._cache.set(cache_key("instagram", username, "advanced"), data)
                 
                 return data
                 
@@ -152,7 +159,8 @@ class InstagramInfoScraper:
         """Export user data to JSON file"""
         filename = self.output_dir / f"{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            # Profiles are ProfileRecords (a mapping, not a dict): dump a plain copy
+            json.dump(dict(data), f, indent=2, ensure_ascii=False)
         return filename
     
     def export_to_csv(self, data_list, filename="instagram_accounts.csv"):
@@ -163,171 +171,162 @@ class InstagramInfoScraper:
             return None
         
         # Filter to get only dictionary results
-        valid_data = [d for d in data_list if isinstance(d, dict)]
+        valid_data = [d for d in data_list if isinstance(d, Mapping)]
         
         if not valid_data:
             return None
         
-        keys = valid_data[0].keys()
-        
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(valid_data)
+        # Union of all keys, so mixed Instagram/TikTok records fit one header
+        export_rows(lambda: iter(valid_data), filepath, "csv")
         
         return filepath
     
     def save_search_history(self):
-        """Save search history to JSON file"""
-        with open(self.search_history_file, 'w', encoding='utf-8') as f:
-            json.dump(self.search_history, f, indent=2, ensure_ascii=False)
+        """Rewrite the full search history snapshot (use record_search for single lookups)"""
+        self.history_journal.replace(self.search_history)
+        self.search_history = self.history_journal.data
+    
+    def record_search(self, username, info):
+        """Append one lookup to the search history journal"""
+        self.history_journal.append(username, info)
     
     def get_all_searches(self):
         """Get all previous searches"""
         return self.search_history
     
-    def export_search_history_to_csv(self, filename="all_searches.csv"):
-        """Export all search history to CSV"""
+    def export_search_history_to_csv(self, filename="all_searches.csv", delta=False):
+        """
+        Export all search history to CSV; returns the file path
+        delta=True writes only profiles that are new or changed since the
+        last export to this file (tracked by a per-file watermark): new ones
+        are appended, changed ones replace their earlier row
+        The number of rows written is left in last_export_rows
+        """
         if not self.search_history:
             return None
         
         filepath = self.output_dir / filename
-        data_list = list(self.search_history.values())
-        
-        keys = data_list[0].keys()
-        
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(data_list)
+        if delta:
+            return self._export_csv_delta(filepath)
         
+        self.last_export_rows = export_rows(lambda: iter(self.search_history.values()), filepath, "csv")
+        self._mark_exported(filepath)
         return filepath
     
-    def export_search_history_to_excel(self, filename="instagram_search_results.xlsx"):
-        """Export all search history to Excel file with professional formatting"""
+    def export_search_history_to_excel(self, filename="instagram_search_results.xlsx", streaming=False, delta=False):
+        """
+        Export all search history to Excel file with professional formatting
+        streaming=True writes rows in bounded memory (for very large histories)
+        delta=True writes only new or changed profiles since the last delta
+        export of this file, as a dated <name>_delta_<time>.xlsx next to it
+        Returns the workbook path (None when a delta has no changes); the
+        number of rows written is left in last_export_rows
+        """
         if not self.search_history:
             return None
         
         filepath = self.output_dir / filename
-        
-        # Create workbook and select active sheet
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Instagram Users"
-        
-        # Define professional styles
-        header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=13, name='Calibri')
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        
-        # Alternating row colors
-        row_fill_light = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        row_fill_white = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-        
-        # Data styling
-        data_font = Font(size=11, name='Calibri')
-        data_alignment_center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        data_alignment_left = Alignment(horizontal="left", vertical="center", wrap_text=True)
-        data_alignment_right = Alignment(horizontal="right", vertical="center", wrap_text=True)
-        
-        border_thin = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
-        
-        # Get all unique keys
-        data_list = list(self.search_history.values())
-        if not data_list:
+        if delta:
+            return self._export_excel_delta(filepath)
+        self.last_export_rows = len(self.search_history)
+        if streaming:
+            result = write_excel_streaming(list(self.search_history.values()), filepath)
+        else:
+            result = write_excel(list(self.search_history.values()), filepath)
+        self._mark_exported(filepath)
+        return result
+    
+    def _mark_exported(self, filepath):
+        """A full export replaces the file, so the next delta starts from here"""
+        watermark = watermark_for(self.output_dir, filepath)
+        watermark.reset()
+        for _ in watermark.changed(self.search_history.items()):
+            pass
+        watermark.commit()
+    
+    def _export_csv_delta(self, filepath):
+        """Append new rows to filepath and rewrite changed ones in place; returns filepath"""
+        watermark = watermark_for(self.output_dir, filepath)
+        changed = list(watermark.changed(self.search_history.items()))
+        self.last_export_rows = len(changed)
+        if not changed:
+            return filepath
+        
+        # Keep the columns of the existing file so appended rows line up;
+        # a new file gets the union of the rows' keys (mixed Instagram/TikTok)
+        keys = None
+        if filepath.exists() and filepath.stat().st_size:
+            with open(filepath, 'r', newline='', encoding='utf-8') as f:
+                keys = next(csv.reader(f), None)
+        
+        # Profiles exported before already have a row (found by username):
+        # replace it, so the file keeps one row per profile
+        updates = {}
+        if keys and 'username' in keys:
+            updates = {_csv_id(row.get('username')): row for key, row in changed if key in watermark}
+        if updates:
+            added = [row for key, row in changed if key not in watermark]
+            self._rewrite_csv(filepath, keys, updates, added)
+        else:
+            rows = [row for _, row in changed]
+            with open(filepath, 'a' if keys else 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=keys or union_keys(rows), extrasaction='ignore')
+                if not keys:
+                    writer.writeheader()
+                writer.writerows(rows)
+        
+        watermark.commit()
+        return filepath
+    
+    def _rewrite_csv(self, filepath, keys, updates, added):
+        """Copy filepath with the rows in updates (by username) replaced and added appended, atomically"""
+        fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as out, \
+                    open(filepath, 'r', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(out, fieldnames=keys, extrasaction='ignore')
+                writer.writeheader()
+                replaced = set()
+                for row in csv.DictReader(f):
+                    row_id = _csv_id(row.get('username'))
+                    if row_id in updates:
+                        writer.writerow(updates.pop(row_id))
+                        replaced.add(row_id)
+                    elif row_id not in replaced:  # Drop duplicates appended by older deltas
+                        writer.writerow(row)
+                # Rows no longer in the file (edited by hand) are written as new ones
+                writer.writerows(list(updates.values()) + added)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _export_excel_delta(self, filepath):
+        """Write new/changed rows to a dated delta workbook; returns its path (None if no changes)"""
+        watermark = watermark_for(self.output_dir, filepath)
+        rows = [row for _, row in watermark.changed(self.search_history.items())]
+        self.last_export_rows = len(rows)
+        if not rows:
             return None
         
-        keys = list(data_list[0].keys())
-        
-        # Define professional column widths
-        column_widths = {
-            'username': 18,
-            'full_name': 28,
-            'followers': 18,
-            'following': 18,
-            'bio': 40,
-            'city': 18,
-            'country': 18,
-            'full_location': 28,
-            'posts_count': 14,
-            'name_changes': 14,
-            'is_business_account': 18,
-            'is_verified': 18,
-            'is_public': 18,
-            'external_url': 45,
-            'profile_pic_url': 45,
-            'biography_html': 45,
-            'search_timestamp': 20
-        }
-        
-        # Write headers with professional styling
-        for col_num, key in enumerate(keys, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = key.replace("_", " ").title()
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = border_thin
-            
-            # Set column width
-            width = column_widths.get(key, 20)
-            ws.column_dimensions[chr(64 + col_num)].width = width
-        
-        # Write data with alternating colors
-        for row_num, data in enumerate(data_list, 2):
-            # Alternate row colors
-            is_even_row = (row_num - 2) % 2 == 0
-            row_fill = row_fill_white if is_even_row else row_fill_light
-            
-            for col_num, key in enumerate(keys, 1):
-                cell = ws.cell(row=row_num, column=col_num)
-                value = data.get(key, "N/A")
-                cell.value = value
-                cell.font = data_font
-                cell.border = border_thin
-                cell.fill = row_fill
-                
-                # Set alignment based on content type
-                if key in ['full_name', 'bio', 'biography_html']:
-                    # Arabic text - right aligned
-                    cell.alignment = Alignment(horizontal="right", vertical="center", wrap_text=True)
-                elif key in ['followers', 'following', 'posts_count', 'name_changes']:
-                    # Numbers - center aligned
-                    cell.alignment = data_alignment_center
-                elif key.startswith('is_'):
-                    # Boolean values - center aligned
-                    cell.alignment = data_alignment_center
-                else:
-                    # Text - left aligned
-                    cell.alignment = data_alignment_left
-        
-        # Set row height for header and data
-        ws.row_dimensions[1].height = 30
-        for row in range(2, len(data_list) + 2):
-            ws.row_dimensions[row].height = 25
-        
-        # Freeze header row
-        ws.freeze_panes = "A2"
-        
-        # Add autofilter to headers
-        ws.auto_filter.ref = f"A1:{chr(64 + len(keys))}{len(data_list) + 1}"
-        
-        # Save workbook
-        wb.save(filepath)
-        
-        return filepath
+        delta_path = filepath.with_name(f"{filepath.stem}_delta_{datetime.now().strftime('%Y%m%d_%H%M%S')}{filepath.suffix}")
+        write_excel_streaming(rows, delta_path)
+        watermark.commit()
+        return delta_path
+
+def _csv_id(username):
+    """Row identity in a delta CSV (usernames are case-insensitive)"""
+    return str(username or '').lower()
 
 
 def display_info(info):
     """Display user information in formatted table"""
-    if isinstance(info, dict):
+    if isinstance(info, Mapping):
         print("\n✅ SUCCESS! Here's the account information:\n")
-        for key, value in info.items():
+        for key, value in render_profile(info).items():
             key_display = key.replace("_", " ").title()
             print(f"  {key_display:<25}: {value}")
         return True
@@ -420,7 +419,7 @@ def main():
             for i, user in enumerate(usernames, 1):
                 print(f"[{i}/{len(usernames)}] 📊 Fetching @{user}...", end=" ", flush=True)
                 info = scraper.get_user_info(user)
-                if isinstance(info, dict):
+                if isinstance(info, Mapping):
                     results.append(info)
                     print("✅")
                 else:
@@ -443,7 +442,7 @@ def main():
                 print(f"📋 Search History ({len(scraper.search_history)} users):\n")
                 for i, (username, data) in enumerate(scraper.search_history.items(), 1):
                     full_name = data.get('full_name', 'N/A')
-                    followers = data.get('followers', 'N/A')
+                    followers = render_count(data.get('followers', 'N/A'))
                     timestamp = data.get('search_timestamp', 'N/A')
                     print(f"  {i}. @{username} ({full_name}) - {followers} followers - {timestamp}")
             else:
@@ -456,7 +455,8 @@ def main():
                 print("  1. Export to CSV")
                 print("  2. Export to Excel")
                 print("  3. Export both")
-                export_type = input("Choose export type (1-3): ").strip()
+                print("  4. Export only new/changed since last export (CSV + Excel)")
+                export_type = input("Choose export type (1-4): ").strip()
                 
                 if export_type in ['1', '3']:
                     csv_path = scraper.export_search_history_to_csv()
@@ -467,6 +467,15 @@ def main():
                     excel_path = scraper.export_search_history_to_excel()
                     if excel_path:
                         print(f"✅ Excel file created: {excel_path}")
+                
+                if export_type == '4':
+                    csv_path = scraper.export_search_history_to_csv(delta=True)
+                    print(f"✅ {scraper.last_export_rows} new/changed rows written to: {csv_path}")
+                    excel_path = scraper.export_search_history_to_excel(delta=True)
+                    if excel_path:
+                        print(f"✅ Excel delta file created ({scraper.last_export_rows} rows): {excel_path}")
+                    else:
+                        print("ℹ️ No new or changed profiles since the last Excel export.")
             else:
                 print("❌ No searches to export.")
         
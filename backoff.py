@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Platform Rate-Limit Backoff
+After an upstream 429, every lookup for that platform waits out the
+window locally instead of hitting the API again
+"""
+
+import threading
+import time
+
+DEFAULT_WINDOW = 60  # seconds, when the upstream sends no Retry-After
+MAX_WINDOW = 900
+
+
+class PlatformBackoff:
+    """Thread-safe per-platform backoff windows"""
+
+    def __init__(self, default_window=DEFAULT_WINDOW, max_window=MAX_WINDOW):
+        self.default_window = default_window
+        self.max_window = max_window
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def trip(self, platform, retry_after=None):
+        """Open (or extend) the backoff window for a platform"""
+        window = _parse_retry_after(retry_after)
+        if window is None:
+            window = self.default_window
+        window = min(window, self.max_window)
+
+        with self._lock:
+            until = time.time() + window
+            if until > self._until.get(platform, 0):
+                self._until[platform] = until
+
+    def remaining(self, platform):
+        """Seconds left in the platform's backoff window (0 when clear)"""
+        with self._lock:
+            until = self._until.get(platform)
+            if until is None:
+                return 0
+            left = until - time.time()
+            if left <= 0:
+                del self._until[platform]
+                return 0
+            return left
+
+    def reset(self, platform):
+        """Close the window early"""
+        with self._lock:
+            self._until.pop(platform, None)
+
+
+def _parse_retry_after(value):
+    """Retry-After header value in seconds (HTTP-date form is ignored)"""
+    if value is None:
+        return None
+    try:
+        return max(0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# Process-wide backoff table shared by all scrapers
+backoff = PlatformBackoff()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Bio Enrichment Engine
+Linked accounts, contacts, hashtags and location pulled from profile bios.
+All patterns are compiled once; a combined literal prefilter decides
+which of them can match a bio, so most bios skip most regex searches.
+The patterns that pass still run one by one: a single alternation of all
+of them cannot reproduce each pattern's own first match where matches
+overlap (an email's @domain against an Instagram handle).
+"""
+
+import re
+
+# Platform -> pattern (first match wins; handle is group 1 or group 2)
+SOCIAL_PATTERNS = {
+    'instagram': re.compile(r'@([a-zA-Z0-9._]{1,30})|instagram\.com/([a-zA-Z0-9._]{1,30})', re.IGNORECASE),
+    'youtube': re.compile(r'youtube\.com/@?([a-zA-Z0-9_-]+)', re.IGNORECASE),
+    'twitter': re.compile(r'twitter\.com/([a-zA-Z0-9_]+)|x\.com/([a-zA-Z0-9_]+)', re.IGNORECASE),
+    'snapchat': re.compile(r'snapchat[\s:]*([a-zA-Z0-9._-]+)', re.IGNORECASE),
+    'discord': re.compile(r'discord(?:\.gg|\.com)?[/\s]*([a-zA-Z0-9]+)', re.IGNORECASE),
+    'telegram': re.compile(r't\.me/([a-zA-Z0-9_]+)|telegram[/\s]*([a-zA-Z0-9_]+)', re.IGNORECASE),
+}
+
+EMAIL_PATTERN = re.compile(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+PHONE_PATTERN = re.compile(r'(\+?1?\s*[-.\(]?\d{3}[-.\)]?\s*\d{3}[-.]?\d{4}|\+\d{1,3}\s?\d{6,14})')
+HASHTAG_PATTERN = re.compile(r'#([a-zA-Z0-9_]+)')
+
+# Tried in order; the first one whose match is longer than one character wins
+LOCATION_PATTERNS = [
+    re.compile(r'📍\s*([^\n]+)'),
+    re.compile(r'🌍\s*([^\n]+)'),
+    re.compile(r'📌\s*([^\n]+)'),
+    re.compile(r'Location:\s*([^\n,]+)'),
+    re.compile(r'From:\s*([^\n,]+)'),
+]
+
+# Combined prefilter: each family's patterns cannot match unless one of its
+# literal needles occurs in the case-folded bio, so a handful of substring
+# checks decides which precompiled patterns are worth running at all
+_NEEDLES = {
+    'instagram': ('@', 'instagram.com/'),
+    'youtube': ('youtube.com/',),
+    'twitter': ('twitter.com/', 'x.com/'),
+    'snapchat': ('snapchat',),
+    'discord': ('discord',),
+    'telegram': ('t.me/', 'telegram'),
+    'email': ('@',),
+    'location': ('📍', '🌍', '📌', 'location:', 'from:'),
+}
+# A phone number always contains a run of at least three digits
+_DIGIT_RUN = re.compile(r'\d{3}')
+
+# The only non-ASCII letters re.IGNORECASE matches against ASCII ones
+# (İ ı -> i, ſ -> s, Kelvin sign -> k); str.lower alone would miss them
+_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+_FOLD_CHARS = re.compile('[\u0130\u0131\u017f\u212a]')
+
+
+def _fold(bio):
+    """Lowercased bio in which every IGNORECASE match of a needle is a plain substring"""
+    if not bio.isascii() and _FOLD_CHARS.search(bio):
+        bio = bio.translate(_FOLD)
+    return bio.lower()
+
+
+def _triggers(bio, needles=_NEEDLES):
+    """Pattern families that can match the bio"""
+    folded = _fold(bio)
+    families = {
+        family for family, family_needles in needles.items()
+        if any(needle in folded for needle in family_needles)
+    }
+    if _DIGIT_RUN.search(bio):
+        families.add('digit')
+    return families
+
+
+def _batch_triggers(bios):
+    """
+    _triggers for many bios
+    Needles that appear nowhere in the whole batch (one scan over the
+    joined bios) are not checked again bio by bio
+    """
+    folded = _fold("\0".join(bios))
+    present = {
+        family: tuple(needle for needle in family_needles if needle in folded)
+        for family, family_needles in _NEEDLES.items()
+    }
+    present = {family: needles for family, needles in present.items() if needles}
+    return [_triggers(bio, present) if bio else set() for bio in bios]
+
+
+def extract_socials(bio, families=None):
+    """Social handles linked from the bio, by platform"""
+    socials = {}
+    if not bio:
+        return socials
+    if families is None:
+        families = _triggers(bio)
+
+    for platform, pattern in SOCIAL_PATTERNS.items():
+        if platform not in families:
+            continue
+        match = pattern.search(bio)
+        if match:
+            handle = match.group(1) or (match.group(2) if match.lastindex >= 2 else None)
+            if handle:
+                socials[platform] = handle
+    return socials
+
+
+def extract_contacts(bio, families=None):
+    """Email and phone number found in the bio"""
+    contacts = {}
+    if not bio:
+        return contacts
+    if families is None:
+        families = _triggers(bio)
+
+    if 'email' in families:
+        match = EMAIL_PATTERN.search(bio)
+        if match:
+            contacts['email'] = match.group(1)
+    if 'digit' in families:
+        match = PHONE_PATTERN.search(bio)
+        if match:
+            contacts['phone'] = match.group(1)
+    return contacts
+
+
+def extract_hashtags(bio, username=""):
+    """Unique hashtags from the bio and username"""
+    text = (bio or "") + " " + (username or "")
+    if '#' not in text:
+        return []
+    return list(set(HASHTAG_PATTERN.findall(text)))
+
+
+def extract_location(bio, families=None):
+    """Location stated in the bio (📍 / Location: / From: ...), or None"""
+    if not bio:
+        return None
+    if families is None:
+        families = _triggers(bio)
+    if 'location' not in families:
+        return None
+
+    for pattern in LOCATION_PATTERNS:
+        match = pattern.search(bio)
+        if match:
+            location = match.group(1).strip()
+            if location and len(location) > 1:
+                return location
+    return None
+
+
+def enrich_bio(bio, username="", families=None):
+    """
+    All bio-derived fields for one profile
+    Returns linked_accounts, contacts, hashtags and (when found) bio_location
+    """
+    bio = bio or ""
+    if families is None:
+        families = _triggers(bio) if bio else set()
+    result = {
+        "linked_accounts": extract_socials(bio, families),
+        "contacts": extract_contacts(bio, families),
+        "hashtags": extract_hashtags(bio, username),
+    }
+    location = extract_location(bio, families)
+    if location:
+        result["bio_location"] = location
+    return result
+
+
+def enrich_bios(bios, usernames=None):
+    """
+    enrich_bio over a whole list, for callers enriching many profiles at
+    once (e.g. re-enriching a saved history). Needles are checked once over
+    the joined bios; usernames, when given, is parallel to bios. Returns
+    one result dict per bio, in order.
+    """
+    bios = [bio or "" for bio in bios]
+    if usernames is None:
+        usernames = [""] * len(bios)
+    return [
+        enrich_bio(bio, username, families)
+        for bio, username, families in zip(bios, usernames, _batch_triggers(bios))
+    ]
+
+
+def enrich_profiles(profiles):
+    """Add the bio-derived fields to each profile dict in place; returns the list"""
+    profiles = list(profiles)
+    results = enrich_bios(
+        [p.get("bio", "") for p in profiles],
+        [p.get("username", "") for p in profiles],
+    )
+    for profile, fields in zip(profiles, results):
+        profile.update(fields)
+    return profiles
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Bio Full-Text Index
+Persistent inverted index (SQLite) over profile bios, hashtags and
+linked accounts, updated one profile at a time. Profiles are grouped in
+scopes (e.g. one per Telegram user) that are searched separately; the
+index can live in its own file or in tables of an existing database
+(HistoryStore keeps it next to the history it indexes). Queries are keywords
+combined with AND / OR / NOT and parentheses, e.g.
+
+    coffee (riyadh OR jeddah) -#ad
+    @natgeo OR links:telegram
+    قهوة ☕
+
+Tokens are normalized like names (see text_normalize); Arabic words are
+also indexed without their definite article, and each emoji (or flag)
+is a token of its own.
+"""
+
+import hashlib
+import re
+import sqlite3
+import sys
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+from text_normalize import normalize
+
+INDEX_VERSION = 2  # Bump when tokenization or schema changes: the index is rebuilt
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bio_meta (
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bio_docs (
+    id INTEGER PRIMARY KEY,
+    scope INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint INTEGER NOT NULL,
+    UNIQUE (scope, key)
+);
+CREATE TABLE IF NOT EXISTS bio_postings (
+    scope INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (scope, term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_bio_postings_doc ON bio_postings (doc);
+"""
+_TABLES = ("bio_postings", "bio_docs", "bio_meta")
+
+_EMOJI = "\u2600-\u27bf\U0001f000-\U0001faff"
+_TOKEN = re.compile(rf"[\U0001f1e6-\U0001f1ff]{{2}}|#?[^\W_]+|[{_EMOJI}]")
+# Emoji presentation selector and skin-tone modifiers: "👍🏽" indexes as "👍"
+_EMOJI_MODIFIERS = re.compile("[\ufe0f\U0001f3fb-\U0001f3ff]")
+# Arabic definite article, optionally after a one-letter conjunction / preposition
+_ARTICLE = re.compile(r"^(?:[وفبك]?ال|لل)(?=\w\w)")
+
+_QUERY_TOKEN = re.compile(r'\s*(\(|\)|"[^"]*"|[^\s()"]+)')
+
+
+class QuerySyntaxError(ValueError):
+    """Malformed search query"""
+
+
+def tokenize(text, expand=True):
+    """
+    Index terms of a text: words, #hashtags and emoji, normalized
+    expand also yields a hashtag's plain word and an Arabic word's
+    article-less stem (so "رياض" finds "#الرياض"); queries do not expand
+    """
+    if not text:
+        return []
+    text = normalize(_EMOJI_MODIFIERS.sub("", text))
+    terms = []
+    for token in _TOKEN.findall(text):
+        terms.append(token)
+        if not expand:
+            continue
+        word = token.lstrip("#")
+        if word != token:
+            terms.append(word)
+        match = _ARTICLE.match(word)
+        if match:
+            terms.append(word[match.end():])
+    return terms
+
+
+def document_terms(profile):
+    """Every term a profile is indexed under"""
+    if not isinstance(profile, Mapping) or "error" in profile:
+        return set()
+    terms = set(tokenize(profile.get("bio") or ""))
+    for tag in profile.get("hashtags") or ():
+        terms.add("#" + normalize(str(tag)))
+    for platform, handle in _linked(profile.get("linked_accounts")):
+        terms.add("@" + normalize(handle))
+        if platform:
+            terms.add("links:" + platform.lower())
+    return terms
+
+
+def _linked(accounts):
+    """(platform, handle) pairs from {platform: handle} (or a list of handles)"""
+    if isinstance(accounts, Mapping):
+        return [(str(p), str(h)) for p, h in accounts.items() if h]
+    if isinstance(accounts, (list, tuple)):
+        return [(None, str(h)) for h in accounts if h]
+    return []
+
+
+def _fingerprint(profile):
+    """64-bit digest of the indexed fields; unchanged profiles are not re-indexed"""
+    if not isinstance(profile, Mapping) or "error" in profile:
+        return 0
+    source = "\0".join((
+        str(profile.get("bio") or ""),
+        " ".join(sorted(map(str, profile.get("hashtags") or ()))),
+        " ".join(sorted(f"{p}={h}" for p, h in _linked(profile.get("linked_accounts")))),
+    ))
+    digest = hashlib.blake2b(source.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class BioIndex:
+    """
+    Inverted index in SQLite, keyed by (scope, string key)
+    Pass connect (a zero-argument callable returning a sqlite3 connection,
+    e.g. HistoryStore._conn) to keep the index in another database; write
+    methods then also accept conn= to join the caller's open transaction.
+    """
+
+    def __init__(self, path=None, connect=None):
+        self.path = Path(path) if path is not None else None
+        self._local = threading.local()
+        if connect is not None:
+            self._conn = connect
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bio_meta'"
+            ).fetchone()
+            version = conn.execute("SELECT version FROM bio_meta").fetchone() if exists else None
+            if version is None or version[0] != INDEX_VERSION:
+                for table in _TABLES:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.executescript(_SCHEMA)
+        with conn:
+            if conn.execute("SELECT 1 FROM bio_meta").fetchone() is None:
+                conn.execute("INSERT INTO bio_meta (version) VALUES (?)", (INDEX_VERSION,))
+
+    def add(self, key, profile, scope=0, conn=None):
+        """Index (or re-index) one profile; a no-op when its bio data is unchanged"""
+        self.add_many([(key, profile)], scope, conn)
+
+    def add_many(self, items, scope=0, conn=None):
+        """add() for each (key, profile) pair, in one transaction"""
+        with self._transaction(conn) as conn:
+            for key, profile in items:
+                self._add(conn, scope, str(key), profile, _fingerprint(profile))
+
+    def remove(self, key, scope=0, conn=None):
+        """Drop a profile from the index"""
+        with self._transaction(conn) as conn:
+            self._remove(conn, scope, str(key))
+
+    def clear(self, scope=0, prefix="", conn=None):
+        """Drop every profile of a scope (only keys starting with prefix, if given)"""
+        where = "scope = ? AND substr(key, 1, ?) = ?"
+        params = (scope, len(prefix), prefix)
+        with self._transaction(conn) as conn:
+            conn.execute(
+                f"DELETE FROM bio_postings WHERE doc IN (SELECT id FROM bio_docs WHERE {where})", params
+            )
+            conn.execute(f"DELETE FROM bio_docs WHERE {where}", params)
+
+    def sync(self, items, scope=0):
+        """
+        Bring a scope in line with a whole history ((key, profile) pairs):
+        new and changed profiles are indexed, missing ones removed
+        """
+        conn = self._conn()
+        indexed = dict(conn.execute("SELECT key, fingerprint FROM bio_docs WHERE scope = ?", (scope,)))
+        with conn:
+            for key, profile in items:
+                key = str(key)
+                fingerprint = _fingerprint(profile)
+                if indexed.pop(key, None) != fingerprint:
+                    self._add(conn, scope, key, profile, fingerprint)
+            for key in indexed:
+                self._remove(conn, scope, key)
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM bio_docs").fetchone()[0]
+
+    def search(self, query, scope=0, limit=None, offset=0):
+        """Keys of the profiles in a scope matching a query, in indexing order"""
+        return self.search_page(query, scope, limit, offset)[1]
+
+    def search_page(self, query, scope=0, limit=None, offset=0):
+        """(total matches, keys from offset on) for a query, in indexing order"""
+        conn = self._conn()
+        ids = sorted(self._evaluate(conn, scope, parse_query(query)))
+        total = len(ids)
+        ids = ids[offset:] if limit is None else ids[offset:offset + limit]
+        keys = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT id, key FROM bio_docs WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            by_id = dict(rows)
+            keys.extend(by_id[i] for i in chunk)
+        return total, keys
+
+    def count(self, query, scope=0):
+        """Number of profiles in a scope matching a query"""
+        return len(self._evaluate(self._conn(), scope, parse_query(query)))
+
+    def _transaction(self, conn):
+        """The caller's connection (its transaction) or a fresh transaction on ours"""
+        return _Joined(conn) if conn is not None else self._conn()
+
+    def _add(self, conn, scope, key, profile, fingerprint):
+        terms = document_terms(profile)
+        if not terms:
+            self._remove(conn, scope, key)
+            return
+        row = conn.execute(
+            "SELECT id, fingerprint FROM bio_docs WHERE scope = ? AND key = ?", (scope, key)
+        ).fetchone()
+        if row is None:
+            doc = conn.execute(
+                "INSERT INTO bio_docs (scope, key, fingerprint) VALUES (?, ?, ?)", (scope, key, fingerprint)
+            ).lastrowid
+        else:
+            doc = row[0]
+            if row[1] == fingerprint:
+                return
+            conn.execute("UPDATE bio_docs SET fingerprint = ? WHERE id = ?", (fingerprint, doc))
+            conn.execute("DELETE FROM bio_postings WHERE doc = ?", (doc,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO bio_postings (scope, term, doc) VALUES (?, ?, ?)",
+            ((scope, term, doc) for term in terms),
+        )
+
+    def _remove(self, conn, scope, key):
+        row = conn.execute("SELECT id FROM bio_docs WHERE scope = ? AND key = ?", (scope, key)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM bio_postings WHERE doc = ?", (row[0],))
+            conn.execute("DELETE FROM bio_docs WHERE id = ?", (row[0],))
+
+    def _evaluate(self, conn, scope, node):
+        """Doc ids in a scope for a parsed query node"""
+        op = node[0]
+        if op == "term":
+            return {
+                doc for (doc,) in conn.execute(
+                    "SELECT doc FROM bio_postings WHERE scope = ? AND term = ?", (scope, node[1])
+                )
+            }
+        if op == "prefix":
+            return {
+                doc for (doc,) in conn.execute(
+                    "SELECT doc FROM bio_postings WHERE scope = ? AND term >= ? AND term < ?",
+                    (scope, node[1], node[1] + "\U0010ffff"),
+                )
+            }
+        if op == "or":
+            result = set()
+            for child in node[1]:
+                result |= self._evaluate(conn, scope, child)
+            return result
+        if op == "and":
+            # Positive operands intersect first (smallest result drives the rest);
+            # negated ones are subtracted instead of complemented
+            positive = [child for child in node[1] if child[0] != "not"]
+            negative = [child[1] for child in node[1] if child[0] == "not"]
+            if positive:
+                result = None
+                for child in positive:
+                    ids = self._evaluate(conn, scope, child)
+                    result = ids if result is None else result & ids
+                    if not result:
+                        return set()
+            else:
+                result = {doc for (doc,) in conn.execute("SELECT id FROM bio_docs WHERE scope = ?", (scope,))}
+            for child in negative:
+                result -= self._evaluate(conn, scope, child)
+            return result
+        if op == "not":
+            return self._evaluate(conn, scope, ("and", [node]))
+        raise ValueError(op)
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class _Joined:
+    """Context manager over a connection whose transaction the caller commits"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        return False
+
+
+def parse_query(query):
+    """
+    Query string -> nested ("and" | "or", [nodes]) / ("not", node) /
+    ("term" | "prefix", term) tuples
+
+    Adjacent words are ANDed; OR binds looser than AND; NOT or a leading
+    "-" negates; a trailing "*" matches by prefix; #tag and @handle match
+    hashtags and linked accounts, links:<platform> any linked account on
+    that platform. A word that tokenizes to several terms ("coffee-lover",
+    "quoted phrases") requires all of them.
+    """
+    tokens = _QUERY_TOKEN.findall(query or "")
+    if not tokens:
+        raise QuerySyntaxError("Empty query")
+    node, position = _parse_or(tokens, 0)
+    if position != len(tokens):
+        raise QuerySyntaxError(f"Unexpected {tokens[position]!r}")
+    return node
+
+
+def _parse_or(tokens, position):
+    children = []
+    while True:
+        node, position = _parse_and(tokens, position)
+        children.append(node)
+        if position < len(tokens) and tokens[position] == "OR":
+            position += 1
+            continue
+        return (children[0] if len(children) == 1 else ("or", children)), position
+
+
+def _parse_and(tokens, position):
+    children = []
+    while position < len(tokens) and tokens[position] not in ("OR", ")"):
+        if tokens[position] == "AND":
+            position += 1
+            continue
+        node, position = _parse_unary(tokens, position)
+        children.append(node)
+    if not children:
+        raise QuerySyntaxError("Missing search term")
+    return (children[0] if len(children) == 1 else ("and", children)), position
+
+
+def _parse_unary(tokens, position):
+    token = tokens[position]
+    if token == "NOT":
+        if position + 1 == len(tokens):
+            raise QuerySyntaxError("NOT needs a search term")
+        node, position = _parse_unary(tokens, position + 1)
+        return ("not", node), position
+    if token == "(":
+        node, position = _parse_or(tokens, position + 1)
+        if position == len(tokens) or tokens[position] != ")":
+            raise QuerySyntaxError("Missing )")
+        return node, position + 1
+    if token.startswith("-") and len(token) > 1:
+        return ("not", _term(token[1:])), position + 1
+    return _term(token), position + 1
+
+
+def _term(word):
+    """Parse node for one query word"""
+    word = word.strip('"')
+    prefix = word.endswith("*")
+    word = word.rstrip("*")
+    lowered = word.lower()
+    if lowered.startswith("links:"):
+        terms = [lowered] if len(lowered) > 6 else []
+    elif word.startswith("@"):
+        terms = ["@" + normalize(word[1:])] if len(word) > 1 else []
+    else:
+        terms = tokenize(word, expand=False)
+    if not terms:
+        raise QuerySyntaxError(f"Nothing to search for in {word!r}")
+    nodes = [("prefix" if prefix and i == len(terms) - 1 else "term", t) for i, t in enumerate(terms)]
+    return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+
+def _main(argv):
+    """python bio_index.py "<query>" [search_history.json]"""
+    if not argv:
+        print(_main.__doc__)
+        return 2
+    from history_journal import open_journal
+
+    journal = open_journal(argv[1] if len(argv) > 1 else "output/search_history.json")
+    try:
+        matches = journal.search_bios(argv[0])
+    except ValueError as e:  # QuerySyntaxError (as bio_index, not __main__)
+        print(f"❌ {e}")
+        return 2
+    for key, profile in matches:
+        bio = " ".join(str(profile.get("bio") or "").split())
+        print(f"@{key}: {bio[:100]}")
+    print(f"{len(matches)} profile(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Persistent Profile Cache Tier
+SQLite (WAL mode) store under the in-memory ProfileCache, so cached
+profiles survive worker restarts. Reads are synchronous; writes are
+queued and flushed in batches by a background writer thread.
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import json_codec
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_profile_cache_expires ON profile_cache (expires_at);
+"""
+
+_STOP = object()
+
+
+class DiskCache:
+    """SQLite-backed key/value tier with write-behind"""
+
+    def __init__(self, path, batch_size=200, purge_interval=600, retention=0):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.purge_interval = purge_interval
+        self.retention = retention  # Keep expired rows this long before purging
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def get(self, key):
+        """Return (value, stored_at, expires_at) or None"""
+        try:
+            row = self._reader().execute(
+                "SELECT value, stored_at, expires_at FROM profile_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return json_codec.loads(row[0]), row[1], row[2]
+
+    def put(self, key, value, stored_at, expires_at):
+        """Queue a write (returns immediately)"""
+        self._start_writer()
+        self._queue.put(("put", key, json_codec.dumps(value), stored_at, expires_at))
+
+    def delete(self, key):
+        """Queue a delete"""
+        self._start_writer()
+        self._queue.put(("delete", key))
+
+    def clear(self):
+        """Queue removal of every row"""
+        self._start_writer()
+        self._queue.put(("clear",))
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        with self._writer_lock:
+            if self._writer is not None:
+                self._queue.put(_STOP)
+                self._writer.join()
+                self._writer = None
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        """One read connection per thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _start_writer(self):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="disk-cache-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)
+
+    def _write_loop(self):
+        conn = self._connect()
+        last_purge = time.time()
+
+        while True:
+            ops = [self._queue.get()]
+            # Drain whatever else is already queued into the same transaction
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            try:
+                with conn:
+                    for op in ops:
+                        if op is _STOP:
+                            stop = True
+                        elif op[0] == "put":
+                            conn.execute(
+                                "INSERT OR REPLACE INTO profile_cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                                op[1:],
+                            )
+                        elif op[0] == "delete":
+                            conn.execute("DELETE FROM profile_cache WHERE key = ?", (op[1],))
+                        elif op[0] == "clear":
+                            conn.execute("DELETE FROM profile_cache")
+
+                    if time.time() - last_purge > self.purge_interval:
+                        conn.execute("DELETE FROM profile_cache WHERE expires_at < ?", (time.time() - self.retention,))
+                        last_purge = time.time()
+            except sqlite3.Error:
+                pass  # Cache tier is best effort
+            finally:
+                for _ in ops:
+                    self._queue.task_done()
+
+            if stop:
+                conn.close()
+                return
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Excel Export
+Professional-looking .xlsx exports of scraped profiles, either as a
+regular in-memory workbook or streamed row by row (write-only mode)
+"""
+
+import json
+from itertools import chain
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Professional column widths (anything else gets 20)
+COLUMN_WIDTHS = {
+    'username': 18,
+    'full_name': 28,
+    'followers': 18,
+    'following': 18,
+    'bio': 40,
+    'city': 18,
+    'country': 18,
+    'full_location': 28,
+    'posts_count': 14,
+    'name_changes': 14,
+    'is_business_account': 18,
+    'is_verified': 18,
+    'is_public': 18,
+    'external_url': 45,
+    'profile_pic_url': 45,
+    'biography_html': 45,
+    'search_timestamp': 20
+}
+
+# Canonical columns of the RapidAPI Instagram and TikTok profiles, for
+# exports that mix both platforms
+PROFILE_COLUMNS = [
+    'platform', 'account_id', 'username', 'full_name', 'followers', 'following',
+    'bio', 'full_location', 'posts_count', 'likes', 'is_verified', 'is_public',
+    'is_business_account', 'external_url', 'profile_pic', 'search_timestamp'
+]
+
+# Column groups that get special alignment
+RIGHT_ALIGNED = ('full_name', 'bio', 'biography_html')  # Arabic text
+CENTER_ALIGNED = ('followers', 'following', 'posts_count', 'name_changes')
+
+
+def write_excel(data_list, filepath, sheet_title="Instagram Users"):
+    """Write profile dicts to an Excel file with professional formatting"""
+    # Create workbook and select active sheet
+    wb = Workbook()
+    ws = wb.active
+    ws.title = sheet_title
+    
+    # Define professional styles
+    header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=13, name='Calibri')
+    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    
+    # Alternating row colors
+    row_fill_light = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+    row_fill_white = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+    
+    # Data styling
+    data_font = Font(size=11, name='Calibri')
+    data_alignment_center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    data_alignment_left = Alignment(horizontal="left", vertical="center", wrap_text=True)
+    data_alignment_right = Alignment(horizontal="right", vertical="center", wrap_text=True)
+    
+    border_thin = Border(
+        left=Side(style='thin', color='000000'),
+        right=Side(style='thin', color='000000'),
+        top=Side(style='thin', color='000000'),
+        bottom=Side(style='thin', color='000000')
+    )
+    
+    if not data_list:
+        return None
+    
+    keys = list(data_list[0].keys())
+    
+    # Write headers with professional styling
+    for col_num, key in enumerate(keys, 1):
+        cell = ws.cell(row=1, column=col_num)
+        cell.value = key.replace("_", " ").title()
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        cell.border = border_thin
+        
+        # Set column width
+        width = COLUMN_WIDTHS.get(key, 20)
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    
+    # Write data with alternating colors
+    for row_num, data in enumerate(data_list, 2):
+        # Alternate row colors
+        is_even_row = (row_num - 2) % 2 == 0
+        row_fill = row_fill_white if is_even_row else row_fill_light
+        
+        for col_num, key in enumerate(keys, 1):
+            cell = ws.cell(row=row_num, column=col_num)
+            value = data.get(key, "N/A")
+            cell.value = value
+            cell.font = data_font
+            cell.border = border_thin
+            cell.fill = row_fill
+            
+            # Set alignment based on content type
+            if key in ['full_name', 'bio', 'biography_html']:
+                # Arabic text - right aligned
+                cell.alignment = Alignment(horizontal="right", vertical="center", wrap_text=True)
+            elif key in ['followers', 'following', 'posts_count', 'name_changes']:
+                # Numbers - center aligned
+                cell.alignment = data_alignment_center
+            elif key.startswith('is_'):
+                # Boolean values - center aligned
+                cell.alignment = data_alignment_center
+            else:
+                # Text - left aligned
+                cell.alignment = data_alignment_left
+    
+    # Set row height for header and data
+    ws.row_dimensions[1].height = 30
+    for row in range(2, len(data_list) + 2):
+        ws.row_dimensions[row].height = 25
+    
+    # Freeze header row
+    ws.freeze_panes = "A2"
+    
+    # Add autofilter to headers
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(keys))}{len(data_list) + 1}"
+    
+    # Save workbook
+    wb.save(filepath)
+    
+    return filepath
+
+
+def write_excel_streaming(rows, filepath, sheet_title="Instagram Users", keys=None):
+    """
+    Stream profile dicts to an Excel file in bounded memory
+    rows can be any iterable (e.g. HistoryStore.iter_history). Rows are
+    written as they arrive using openpyxl's write-only mode, and every
+    cell points at one of a few shared named styles instead of carrying
+    its own font/fill/border objects. Columns come from keys, or from the
+    first row when keys is None. filepath may also be a binary file object.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return None
+    if keys is None:
+        keys = list(first.keys())
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    for style in _named_styles():
+        wb.add_named_style(style)
+
+    # Layout must be set before the first row is streamed out
+    for col_num, key in enumerate(keys, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = COLUMN_WIDTHS.get(key, 20)
+    ws.sheet_format.defaultRowHeight = 25
+    ws.sheet_format.customHeight = True
+    ws.freeze_panes = "A2"
+
+    header = []
+    for key in keys:
+        cell = WriteOnlyCell(ws, value=key.replace("_", " ").title())
+        cell.style = "export_header"
+        header.append(cell)
+    ws.append(header)
+
+    column_styles = [_column_style(key) for key in keys]
+    row_count = 0
+    for row_count, data in enumerate(chain([first], rows), 1):
+        shade = "white" if row_count % 2 else "light"
+        cells = []
+        for key, style in zip(keys, column_styles):
+            cell = WriteOnlyCell(ws, value=_cell_value(data.get(key, "N/A")))
+            cell.style = f"{style}_{shade}"
+            cells.append(cell)
+        ws.append(cells)
+
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(keys))}{row_count + 1}"
+    wb.save(filepath)
+    return filepath
+
+
+def _column_style(key):
+    """Named style prefix for a column, by content type"""
+    if key in RIGHT_ALIGNED:
+        return "export_right"
+    if key in CENTER_ALIGNED or key.startswith('is_'):
+        return "export_center"
+    return "export_left"
+
+
+def _named_styles():
+    """Header style plus one data style per alignment and row shade"""
+    border_thin = Border(
+        left=Side(style='thin', color='000000'),
+        right=Side(style='thin', color='000000'),
+        top=Side(style='thin', color='000000'),
+        bottom=Side(style='thin', color='000000')
+    )
+    styles = [NamedStyle(
+        name="export_header",
+        font=Font(bold=True, color="FFFFFF", size=13, name='Calibri'),
+        fill=PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid"),
+        alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+        border=border_thin,
+    )]
+    fills = {"white": "FFFFFF", "light": "D9E1F2"}
+    for align in ("left", "center", "right"):
+        for shade, color in fills.items():
+            styles.append(NamedStyle(
+                name=f"export_{align}_{shade}",
+                font=Font(size=11, name='Calibri'),
+                fill=PatternFill(start_color=color, end_color=color, fill_type="solid"),
+                alignment=Alignment(horizontal=align, vertical="center", wrap_text=True),
+                border=border_thin,
+            ))
+    return styles
+
+
+def _cell_value(value):
+    """Excel-safe cell value (nested data such as linked_accounts becomes JSON)"""
+    if isinstance(value, (dict, list, tuple, set)):
+        return json.dumps(list(value) if isinstance(value, set) else value, ensure_ascii=False)
+    return value
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Streaming Export Pipeline
+Rows flow from a generator (e.g. HistoryStore.iter_history) into a
+pluggable sink: NDJSON, CSV / gzip CSV with a union schema, or Parquet
+when pyarrow is installed. Memory stays flat for any history size.
+"""
+
+import csv
+import gzip
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+import json_codec
+from profile_record import COUNT_FIELDS, FLAG_LABELS, parse_count, parse_flag
+
+
+class NDJSONSink:
+    """One JSON object per line (.ndjson, or .ndjson.gz with compress=True)"""
+
+    needs_schema = False
+
+    def __init__(self, path, compress=False):
+        self.path = path
+        self._file = _open_text(path, compress)
+
+    def write(self, row):
+        self._file.write(json_codec.dumps(row))
+        self._file.write("\n")
+
+    def close(self):
+        _close_text(self._file, self.path)
+
+
+class CSVSink:
+    """
+    CSV over a fixed union schema (.csv, or .csv.gz with compress=True)
+    Rows missing a column get an empty cell instead of failing
+    """
+
+    needs_schema = True
+
+    def __init__(self, path, fieldnames, compress=True):
+        self.path = path
+        self._file = _open_text(path, compress)
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, restval="", extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow({k: _scalar(v) for k, v in row.items()})
+
+    def close(self):
+        _close_text(self._file, self.path)
+
+
+class ParquetSink:
+    """
+    Columnar Parquet file written in row groups of batch_size rows
+    Columns are typed: profile counts are int64 and flags bool (coerced like
+    ProfileRecord does); other columns take the kind of their values
+    (int64, float64, bool), falling back to string when the values are
+    mixed or not scalar. fieldnames may map each name to its kind (see
+    column_kinds); a plain list of names has the kinds inferred from the
+    first batch, and later values that do not fit are written as null.
+    """
+
+    needs_schema = True
+    typed_schema = True
+
+    def __init__(self, path, fieldnames, batch_size=5000):
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.batch_size = batch_size
+        self._kinds = dict(fieldnames) if isinstance(fieldnames, dict) else None
+        self._writer = None
+        self._batch = []
+
+    def write(self, row):
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        if self._writer is None:
+            self._open()  # No rows: still write a valid (empty) file
+        self._writer.close()
+
+    def _open(self):
+        if self._kinds is None:
+            self._kinds = column_kinds(self._batch, self.fieldnames)
+        self._schema = pa.schema([
+            (name, _ARROW_TYPES[self._kinds.get(name, "string")]()) for name in self.fieldnames
+        ])
+        where = self.path if hasattr(self.path, "write") else str(self.path)
+        self._writer = pq.ParquetWriter(where, self._schema, compression="snappy")
+
+    def _flush(self):
+        if not self._batch:
+            return
+        if self._writer is None:
+            self._open()
+        columns = {}
+        for name in self.fieldnames:
+            convert = _CONVERTERS[self._kinds.get(name, "string")]
+            columns[name] = [convert(row.get(name)) for row in self._batch]
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+        self._batch = []
+
+
+# Format name -> (sink class, sink options, file extension)
+SINKS = {
+    "ndjson": (NDJSONSink, {}, ".ndjson"),
+    "ndjson.gz": (NDJSONSink, {"compress": True}, ".ndjson.gz"),
+    "csv": (CSVSink, {"compress": False}, ".csv"),
+    "csv.gz": (CSVSink, {"compress": True}, ".csv.gz"),
+    "parquet": (ParquetSink, {}, ".parquet"),
+}
+
+
+def available_formats():
+    """Export formats usable in this environment"""
+    return [name for name in SINKS if name != "parquet" or pa is not None]
+
+
+def union_keys(rows, first=()):
+    """Every key seen across rows, in order of first appearance"""
+    keys = dict.fromkeys(first)
+    for row in rows:
+        for key in row:
+            if key not in keys:
+                keys[key] = None
+    return list(keys)
+
+
+def column_kinds(rows, first=()):
+    """
+    Union of keys (as union_keys) mapped to each column's value kind:
+    "int", "float", "bool" or "string" (mixed, non-scalar or all-null)
+    Profile counts are always "int" and flags "bool"
+    """
+    kinds = dict.fromkeys(first)
+    for row in rows:
+        for key, value in row.items():
+            kind = kinds.get(key)
+            if kind == "string":
+                continue
+            if key in COUNT_FIELDS:
+                kinds[key] = "int"
+            elif key in FLAG_LABELS:
+                kinds[key] = "bool"
+            elif value is None:
+                kinds.setdefault(key, None)
+            else:
+                kinds[key] = _merge_kinds(kind, _VALUE_KINDS.get(type(value), "string"))
+    return {key: kind or "string" for key, kind in kinds.items()}
+
+
+def export_rows(row_source, path, fmt="csv.gz", fieldnames=None):
+    """
+    Stream rows into a file of the given format; returns the row count
+    path may also be a binary file object, which is left open
+    row_source is a zero-argument callable returning a fresh row iterator,
+    so formats with a fixed schema can take one pass to collect the union
+    of keys (and, for Parquet, column kinds) before the writing pass (pass
+    fieldnames to skip it)
+    """
+    sink_cls, options, _ = SINKS[fmt]
+    if sink_cls.needs_schema:
+        if fieldnames is None:
+            schema = column_kinds if getattr(sink_cls, "typed_schema", False) else union_keys
+            fieldnames = schema(row_source())
+        sink = sink_cls(path, fieldnames, **options)
+    else:
+        sink = sink_cls(path, **options)
+
+    count = 0
+    try:
+        for count, row in enumerate(row_source(), 1):
+            sink.write(row)
+    finally:
+        sink.close()
+    return count
+
+
+def export_history(store, user_id, path, fmt="csv.gz", platform=None, chunk_size=1000):
+    """Stream one user's stored history to a file; returns the row count"""
+    return export_rows(
+        lambda: store.iter_history(user_id, platform, chunk_size=chunk_size),
+        path,
+        fmt,
+    )
+
+
+def _open_text(target, compress):
+    """UTF-8 text stream over a path or a caller-owned binary file object"""
+    if not hasattr(target, "write"):
+        if compress:
+            return gzip.open(target, "wt", encoding="utf-8", newline="")
+        return open(target, "w", encoding="utf-8", newline="")
+    raw = gzip.GzipFile(fileobj=target, mode="wb") if compress else target
+    return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+
+def _close_text(stream, target):
+    """Close a stream from _open_text, leaving a caller-owned file object open"""
+    if not hasattr(target, "write"):
+        stream.close()
+        return
+    stream.flush()
+    raw = stream.detach()
+    if raw is not target:
+        raw.close()  # GzipFile: writes the trailer, target stays open
+
+
+def _scalar(value):
+    """CSV-safe cell value (containers become JSON)"""
+    if isinstance(value, (dict, list, tuple, set)):
+        return json.dumps(list(value) if isinstance(value, set) else value, ensure_ascii=False)
+    return value
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = _scalar(value)
+    return value if isinstance(value, str) else str(value)
+
+
+_VALUE_KINDS = {bool: "bool", int: "int", float: "float"}
+
+
+def _merge_kinds(kind, other):
+    if kind is None or kind == other:
+        return other
+    if {kind, other} == {"int", "float"}:
+        return "float"
+    return "string"
+
+
+def _to_int(value):
+    return parse_count(value) if value is not None else None
+
+
+def _to_float(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value):
+    return parse_flag(value) if value is not None else None
+
+
+_CONVERTERS = {"int": _to_int, "float": _to_float, "bool": _to_bool, "string": _text}
+_ARROW_TYPES = {
+    "int": lambda: pa.int64(),
+    "float": lambda: pa.float64(),
+    "bool": lambda: pa.bool_(),
+    "string": lambda: pa.string(),
+}
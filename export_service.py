@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Export Worker Pool
+Builds history exports in worker processes so a large workbook never
+blocks the bot's event loop. Exports are built in memory and only spill
+to a temp file above EXPORT_SPOOL_MAX_BYTES.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from spill_buffer import SpillBuffer, DEFAULT_MAX_SIZE
+
+DEFAULT_WORKERS = 2
+DEFAULT_PER_USER = 1     # Concurrent exports one Telegram user may run
+DEFAULT_MAX_QUEUE = 16   # Exports running or waiting, across all users
+
+
+class ExportBusy(Exception):
+    """Raised when an export is refused by the per-user limit or the queue cap"""
+
+
+def export_history(user_id, fmt="xlsx", sheet_title="Search History", max_size=DEFAULT_MAX_SIZE, spill_dir=None):
+    """
+    Worker entry point: stream one user's history into a spill buffer
+    fmt is "xlsx" or any export_pipeline format (ndjson, csv.gz, parquet...).
+    Returns the file as bytes when it stayed under max_size, the path of
+    the spilled temp file otherwise, or None when there is nothing to
+    export. Runs in a worker process with its own history store connection.
+    """
+    from history_store import get_history_store
+
+    buffer = SpillBuffer(max_size, dir=spill_dir, suffix=f".{fmt}")
+    try:
+        if fmt == "xlsx":
+            from excel_export import write_excel_streaming, PROFILE_COLUMNS
+            rows = write_excel_streaming(
+                get_history_store().iter_history(user_id),
+                buffer,
+                sheet_title=sheet_title,
+                keys=PROFILE_COLUMNS
+            ) is not None
+        else:
+            from export_pipeline import export_history as export_rows
+            rows = export_rows(get_history_store(), user_id, buffer, fmt)
+    except BaseException:
+        buffer.discard()
+        raise
+
+    if not rows:
+        buffer.discard()
+        return None
+    if buffer.spilled:
+        buffer.close()
+        return buffer.path
+    data = buffer.getvalue()
+    buffer.close()
+    return data
+
+
+class ExportArtifact:
+    """
+    A built export for one version of a user's history
+    The content lives in data (bytes) or, for large exports, in the spilled
+    temp file at path, until it is uploaded and only file_id is needed
+    """
+
+    __slots__ = ("version", "fmt", "data", "path", "row_count", "file_id")
+
+    def __init__(self, version, fmt, content, row_count, file_id=None):
+        self.version = version
+        self.fmt = fmt
+        self.data = content if isinstance(content, bytes) else None
+        self.path = content if isinstance(content, str) else None
+        self.row_count = row_count
+        self.file_id = file_id
+
+    @property
+    def available(self):
+        """True while the content can still be sent (or resent by file_id)"""
+        return self.file_id is not None or self.data is not None or (
+            self.path is not None and os.path.exists(self.path)
+        )
+
+    def open(self):
+        """Readable binary stream of the content, for send_document"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.path, "rb")
+
+    def release(self):
+        """Free the content (memory or temp file); file_id is kept"""
+        self.data = None
+        if self.path is not None:
+            _remove_file(self.path)
+            self.path = None
+
+
+class ExportService:
+    """
+    Process pool plus admission control for export jobs
+    Jobs beyond max_per_user for one user, or beyond max_queue in total,
+    are refused with ExportBusy instead of queueing without bound
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_per_user=DEFAULT_PER_USER, max_queue=DEFAULT_MAX_QUEUE,
+                 spool_max_bytes=DEFAULT_MAX_SIZE, spill_dir=None):
+        self.max_workers = max_workers
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.spool_max_bytes = spool_max_bytes
+        self.spill_dir = spill_dir
+        self._pool = None
+        self._active = {}
+        self._pending = 0
+        self._artifacts = {}
+
+    async def submit(self, user_id, fn, *args):
+        """Run fn(*args) in the pool on behalf of user_id and await its result"""
+        if self._active.get(user_id, 0) >= self.max_per_user:
+            raise ExportBusy("⏳ Your previous export is still running.")
+        if self._pending >= self.max_queue:
+            raise ExportBusy("⏳ Export queue is full. Please try again shortly.")
+
+        # Single event loop: admission bookkeeping needs no lock
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        finally:
+            self._pending -= 1
+            self._active[user_id] -= 1
+            if not self._active[user_id]:
+                del self._active[user_id]
+
+    async def export_history(self, user_id, version, row_count, fmt="xlsx"):
+        """
+        The user's history export for a given history version and format
+        Returns the cached ExportArtifact while the version is unchanged,
+        otherwise builds a new one in the pool and caches that
+        """
+        artifact = self.cached(user_id, version, fmt)
+        if artifact is not None:
+            return artifact
+
+        content = await self.submit(
+            user_id, export_history, user_id, fmt, "Search History", self.spool_max_bytes, self.spill_dir
+        )
+        if content is None:
+            return None
+        artifact = ExportArtifact(version, fmt, content, row_count)
+        self._store_artifact(user_id, artifact)
+        return artifact
+
+    def cached(self, user_id, version, fmt="xlsx"):
+        """Cached artifact for exactly this history version and format, else None"""
+        artifact = self._artifacts.get((user_id, fmt))
+        if artifact is None or artifact.version != version or not artifact.available:
+            return None
+        return artifact
+
+    def remember_upload(self, user_id, artifact, file_id):
+        """
+        Keep the Telegram file_id of an uploaded artifact
+        Repeat exports resend by file_id, so the content is no longer needed
+        """
+        artifact.file_id = file_id
+        artifact.release()
+
+    def discard(self, user_id, artifact):
+        """
+        Drop an artifact whose upload failed, with its content
+        Otherwise up to spool_max_bytes would stay cached until the user's
+        next export; a retry builds the file again
+        """
+        key = (user_id, artifact.fmt)
+        if self._artifacts.get(key) is artifact:
+            del self._artifacts[key]
+        artifact.release()
+
+    def _store_artifact(self, user_id, artifact):
+        key = (user_id, artifact.fmt)
+        old = self._artifacts.get(key)
+        self._artifacts[key] = artifact
+        if old is not None and old is not artifact:
+            old.release()
+
+    def queue_depth(self):
+        """Exports currently running or waiting for a worker"""
+        return self._pending
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes and drop unsent artifacts"""
+        for artifact in self._artifacts.values():
+            artifact.release()
+        self._artifacts.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a process that runs asyncio and SQLite threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_service = None
+
+
+def get_export_service():
+    """
+    Process-wide export service, sized from EXPORT_WORKERS / EXPORT_PER_USER /
+    EXPORT_MAX_QUEUE, spooling up to EXPORT_SPOOL_MAX_BYTES in memory
+    (larger exports spill to EXPORT_SPILL_DIR, default the system temp dir)
+    """
+    global _service
+    if _service is None:
+        _service = ExportService(
+            max_workers=int(os.getenv("EXPORT_WORKERS", str(DEFAULT_WORKERS))),
+            max_per_user=int(os.getenv("EXPORT_PER_USER", str(DEFAULT_PER_USER))),
+            max_queue=int(os.getenv("EXPORT_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+            spool_max_bytes=int(os.getenv("EXPORT_SPOOL_MAX_BYTES", str(DEFAULT_MAX_SIZE))),
+            spill_dir=os.getenv("EXPORT_SPILL_DIR") or None,
+        )
+    return _service
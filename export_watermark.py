@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Export Watermarks
+Remembers what each export destination already contains, so repeat
+exports only write profiles that are new or changed since the last one
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# Keys that change on every lookup without the profile itself changing
+VOLATILE_KEYS = ("search_timestamp", "is_stale", "cache_age_seconds")
+
+
+class ExportWatermark:
+    """
+    Per-destination record of exported rows (key -> content digest)
+    Call changed() to pick the rows to write, then commit() once the
+    write succeeded; a failed export leaves the watermark untouched
+    """
+
+    def __init__(self, state_path):
+        self.state_path = Path(state_path)
+        self._digests = self._load()
+        self._staged = {}
+
+    def changed(self, items):
+        """Yield (key, row) pairs that are new or differ from the last export"""
+        for key, row in items:
+            digest = row_digest(row)
+            if self._digests.get(key) != digest:
+                self._staged[key] = digest
+                yield key, row
+
+    def commit(self):
+        """Mark the rows yielded by changed() as exported"""
+        if not self._staged:
+            return
+        self._digests.update(self._staged)
+        self._staged = {}
+        self._save()
+
+    def reset(self):
+        """Forget everything (the next export is a full one)"""
+        self._digests = {}
+        self._staged = {}
+        self.state_path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return len(self._digests)
+
+    def __contains__(self, key):
+        """True when key was exported before (as of the last commit)"""
+        return key in self._digests
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_path.parent, prefix=".watermark.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._digests, f)
+            os.replace(tmp_path, self.state_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def row_digest(row):
+    """Stable short digest of a profile dict, ignoring volatile keys"""
+    stable = {k: v for k, v in row.items() if k not in VOLATILE_KEYS}
+    payload = json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def watermark_for(output_dir, destination):
+    """Watermark of one export destination file, kept next to it"""
+    return ExportWatermark(Path(output_dir) / ".export_state" / f"{Path(destination).name}.json")
@@ -2,7 +2,9 @@ import instaloader
 import time
 import os
 import json
+from collections.abc import Mapping
 from pathlib import Path
+from profile_record import ProfileRecord, render_profile
 
 def get_instagram_info(username, retries=5, delay=10, login_user=None, login_pass=None):
     """
@@ -82,27 +84,27 @@ def get_instagram_info(username, retries=5, delay=10, login_user=None, login_pas
                 pass  # Location data not available
 
             # Count name changes
-            name_changes = "Not available"
+            name_changes = None  # Left unset in the record unless known
             if hasattr(profile, 'name_changes') and profile.name_changes:
                 name_changes = len(profile.name_changes)
             
-            data = {
+            data = ProfileRecord({
                 "username": profile.username,
                 "full_name": profile.full_name,
-                "followers": f"{profile.followers:,}",
-                "following": f"{profile.followees:,}",
+                "followers": profile.followers,
+                "following": profile.followees,
                 "bio": profile.biography if profile.biography else "No bio set",
                 "city": city,
                 "country": country,
                 "full_location": full_location,
                 "posts_count": profile.mediacount,
                 "name_changes": name_changes,
-                "is_business_account": "✅ Yes" if profile.is_business_account else "❌ No",
-                "is_verified": "✅ Yes" if profile.is_verified else "❌ No",
-                "is_public": "🌐 Yes" if not profile.is_private else "🔒 No",
+                "is_business_account": profile.is_business_account,
+                "is_verified": profile.is_verified,
+                "is_public": not profile.is_private,
                 "external_url": profile.external_url if profile.external_url else "Not set",
-                "igtv_count": profile.igtvcount if hasattr(profile, 'igtvcount') else "N/A"
-            }
+                "igtv_count": getattr(profile, 'igtvcount', None)
+            })
 
             return data
 
@@ -153,9 +155,9 @@ if __name__ == "__main__":
         
         info = get_instagram_info(username, login_user=login_user, login_pass=login_pass)
         
-        if isinstance(info, dict):
+        if isinstance(info, Mapping):
             print("\n✅ SUCCESS! Here's the account information:\n")
-            for key, value in info.items():
+            for key, value in render_profile(info).items():
                 # Format output nicely
                 key_display = key.replace("_", " ").title()
                 print(f"  {key_display:<20}: {value}")
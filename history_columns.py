@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Columnar History
+Search history held as columns instead of a list of profile dicts:
+counts in array('d') (NaN when unknown), flags in array('b') (-1 when
+unknown), low-cardinality text dictionary-encoded. Numeric columns come
+out as NumPy arrays (NumPy is a requirement), so aggregations over a whole
+history run vectorized; plain arrays are only a fallback for environments
+without it.
+"""
+
+import math
+import sys
+import threading
+from array import array
+
+from profile_record import parse_count, parse_flag
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUMERIC_COLUMNS = ("followers", "following", "posts_count", "likes")
+FLAG_COLUMNS = ("is_verified", "is_public", "is_business_account")
+CATEGORY_COLUMNS = ("platform", "full_location")  # Few distinct values: stored as codes
+TEXT_COLUMNS = ("username", "full_name")
+
+_NAN = float("nan")
+
+
+class ColumnarHistory:
+    """
+    Append-only column store keyed like the history it mirrors
+    Appending an existing key overwrites its row in place (the latest
+    lookup of a username replaces the earlier one, as in the history).
+    Appends and column reads are serialized, so readers always get a
+    consistent copy while lookups keep arriving.
+    """
+
+    def __init__(self, items=()):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._numeric = {name: array("d") for name in NUMERIC_COLUMNS}
+        self._flags = {name: array("b") for name in FLAG_COLUMNS}
+        self._codes = {name: array("l") for name in CATEGORY_COLUMNS}
+        self._labels = {name: [] for name in CATEGORY_COLUMNS}
+        self._label_codes = {name: {} for name in CATEGORY_COLUMNS}
+        self._text = {name: [] for name in TEXT_COLUMNS}
+        self.extend(items)
+
+    def append(self, key, profile):
+        """Add (or replace) the row for key from a profile mapping"""
+        with self._lock:
+            self._append(key, profile)
+
+    def _append(self, key, profile):
+        row = self._index.get(key)
+        if row is None:
+            self._index[key] = len(self._index)
+            for name, column in self._numeric.items():
+                column.append(_count(profile.get(name)))
+            for name, column in self._flags.items():
+                column.append(_flag(profile.get(name)))
+            for name, column in self._codes.items():
+                column.append(self._code(name, profile.get(name)))
+            for name, column in self._text.items():
+                column.append(_text(profile.get(name)))
+            return
+
+        for name, column in self._numeric.items():
+            column[row] = _count(profile.get(name))
+        for name, column in self._flags.items():
+            column[row] = _flag(profile.get(name))
+        for name, column in self._codes.items():
+            column[row] = self._code(name, profile.get(name))
+        for name, column in self._text.items():
+            column[row] = _text(profile.get(name))
+
+    def extend(self, items):
+        """append() for each (key, profile) pair"""
+        with self._lock:
+            for key, profile in items:
+                self._append(key, profile)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def column(self, name):
+        """
+        A numeric column (float, NaN where unknown) or flag column (1, 0,
+        -1 where unknown): a NumPy copy when NumPy is installed, else an array
+        """
+        if name in self._numeric:
+            data, dtype = self._numeric[name], "float64"
+        elif name in self._flags:
+            data, dtype = self._flags[name], "int8"
+        else:
+            raise KeyError(name)
+        with self._lock:
+            if np is not None:
+                # Copy: a live view would stop the array from growing
+                return np.frombuffer(data, dtype=dtype).copy()
+            return array(data.typecode, data)
+
+    def categories(self, name):
+        """(codes, labels) of a dictionary-encoded column; labels[code] is the value"""
+        codes = self._codes[name]
+        with self._lock:
+            if np is not None:
+                return np.frombuffer(codes, dtype=f"i{codes.itemsize}").copy(), list(self._labels[name])
+            return array(codes.typecode, codes), list(self._labels[name])
+
+    def text(self, name):
+        """A text column (shares the history's strings), row order"""
+        with self._lock:
+            return list(self._text[name])
+
+    def keys(self):
+        """Row keys, in row order"""
+        with self._lock:
+            return list(self._index)
+
+    def summary(self, name, percentiles=(50, 90, 99)):
+        """count / min / max / mean / p<q> of a numeric column, ignoring unknowns"""
+        values = self.column(name)
+        if np is not None:
+            values = values[~np.isnan(values)]
+            if not values.size:
+                return {"count": 0}
+            result = {
+                "count": int(values.size),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "mean": float(values.mean()),
+            }
+            for q, value in zip(percentiles, np.percentile(values, percentiles)):
+                result[f"p{q}"] = float(value)
+            return result
+
+        values = sorted(v for v in values if not math.isnan(v))
+        if not values:
+            return {"count": 0}
+        result = {
+            "count": len(values),
+            "min": values[0],
+            "max": values[-1],
+            "mean": math.fsum(values) / len(values),
+        }
+        for q in percentiles:
+            result[f"p{q}"] = percentile(values, q)
+        return result
+
+    def _code(self, name, value):
+        if value is None:
+            return -1
+        value = sys.intern(str(value))
+        codes = self._label_codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._labels[name])
+            self._labels[name].append(value)
+        return code
+
+
+def percentile(sorted_values, q):
+    """q-th percentile of sorted values, interpolated linearly (NumPy's default)"""
+    position = (len(sorted_values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _count(value):
+    count = parse_count(value)
+    return _NAN if count is None else float(count)
+
+
+def _flag(value):
+    flag = parse_flag(value)
+    return -1 if flag is None else int(flag)
+
+
+def _text(value):
+    return value if isinstance(value, str) else ""
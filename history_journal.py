@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Append-Only Search History Journal
+Each lookup appends one JSON line to search_history.jsonl. A background
+compaction folds the journal into the search_history.json snapshot,
+which is replaced atomically so a crash never leaves it half-written.
+Bios are kept searchable in search_history.index.sqlite3 (see bio_index),
+indexed in batches outside the append path. The index is opened and
+caught up on the first bio search, so opening a journal never touches it.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import json_codec
+from bio_index import BioIndex
+from history_columns import ColumnarHistory
+from profile_record import as_record
+
+COMPACT_EVERY = 500  # Journal records between background compactions
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def open_journal(snapshot_path):
+    """Shared journal for a snapshot file (one per path per process)"""
+    key = str(Path(snapshot_path).resolve())
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = _journals[key] = HistoryJournal(snapshot_path)
+        return journal
+
+
+class HistoryJournal:
+    """
+    Search history as snapshot + append-only journal
+    data holds the replayed history dict and is shared by every scraper
+    that opens the same snapshot path
+    """
+
+    def __init__(self, snapshot_path, compact_every=COMPACT_EVERY):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".jsonl")
+        self.rotated_path = self.snapshot_path.with_suffix(".jsonl.compacting")
+        self.compact_every = compact_every
+        self.data = {}
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+        self._pending = 0
+        self._file = None
+        self._columns = None
+        self._unindexed = {}  # Appended since the last bio index batch (key -> profile)
+        # Next batch re-syncs the whole index: set until the first search catches up
+        # on anything saved while the index was closed, and again after replace()
+        self._reindex = True
+        self._index_lock = threading.Lock()
+        self.bio_index = None  # Opened by the first index_bios()
+        self._load()
+
+    def append(self, key, value):
+        """Record one lookup (a single line write)"""
+        line = json_codec.dumps({"k": key, "v": value}) + "\n"
+        with self._lock:
+            self.data[key] = value
+            if self._columns is not None:
+                self._columns.append(key, value)
+            self._write(line)
+            if not self._reindex:
+                self._unindexed[key] = value  # Indexed in batches (index_bios), off this path
+            start = self._pending >= self.compact_every and not self._compacting
+            if start:
+                self._compacting = True
+
+        if start:
+            threading.Thread(target=self.compact, name="history-compaction", daemon=True).start()
+
+    def replace(self, history):
+        """Replace the whole history (e.g. after /clear) and snapshot it"""
+        with self._lock:
+            if history is not self.data:
+                self.data.clear()
+                self.data.update(history)
+            self._columns = None  # Rows may have been removed: rebuild on demand
+            # Journal the reset so a crash mid-compaction cannot resurrect old rows
+            lines = [json_codec.dumps({"reset": True}) + "\n"]
+            lines += [json_codec.dumps({"k": k, "v": v}) + "\n" for k, v in self.data.items()]
+            self._write("".join(lines))
+            self._unindexed.clear()
+            self._reindex = True
+        self.compact()
+
+    def columns(self):
+        """Columnar view of the history, built once and kept in step with append()"""
+        with self._lock:
+            if self._columns is None:
+                self._columns = ColumnarHistory(self.data.items())
+            return self._columns
+
+    def search_bios(self, query, limit=None):
+        """(key, profile) pairs whose bio, hashtags or linked accounts match a bio_index query"""
+        self.index_bios()
+        keys = self.bio_index.search(query, limit=limit)
+        return [(key, self.data[key]) for key in keys if key in self.data]
+
+    def index_bios(self):
+        """
+        Apply the pending appends to the bio index in one transaction
+        Runs before every search, and after each compaction once a search
+        has opened the index; the journal lock is only held to take the
+        batch, never during the SQLite work
+        """
+        with self._index_lock:
+            if self.bio_index is None:
+                self.bio_index = BioIndex(self.snapshot_path.with_suffix(".index.sqlite3"))
+            with self._lock:
+                batch, self._unindexed = self._unindexed, {}
+                history = dict(self.data) if self._reindex else None
+                self._reindex = False
+            try:
+                if history is not None:
+                    self.bio_index.sync(history.items())
+                elif batch:
+                    self.bio_index.add_many(batch.items())
+            except sqlite3.Error:
+                # Keep the batch (newer appends win) for the next attempt
+                with self._lock:
+                    self._unindexed = {**batch, **self._unindexed}
+                    self._reindex = self._reindex or history is not None
+                raise
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot, atomically"""
+        with self._compact_lock:
+            with self._lock:
+                self._rotate()
+                snapshot = dict(self.data)
+                self._pending = 0
+
+            try:
+                self._write_snapshot(snapshot)
+                self.rotated_path.unlink(missing_ok=True)
+            except OSError:
+                pass  # Rotated journal is replayed again on next load
+            finally:
+                self._compacting = False
+
+        if self.bio_index is not None:
+            try:
+                self.index_bios()
+            except sqlite3.Error:
+                pass  # Batch stays queued for the next compaction or search
+
+    def close(self):
+        """Index pending appends (if the index is open) and close the journal file handle"""
+        if self.bio_index is not None:
+            try:
+                self.index_bios()
+            except sqlite3.Error:
+                pass  # The next open re-syncs the whole index on its first search
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, text):
+        if self._file is None:
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._file.write(text)
+        self._file.flush()
+        self._pending += text.count("\n")
+
+    def _rotate(self):
+        """Move the live journal aside and start an empty one"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.journal_path.exists():
+            if self.rotated_path.exists():
+                # Left over from a failed compaction: keep both in order
+                with open(self.rotated_path, "a", encoding="utf-8") as rotated, \
+                        open(self.journal_path, "r", encoding="utf-8") as live:
+                    rotated.write("\n" + live.read())
+                self.journal_path.unlink()
+            else:
+                os.replace(self.journal_path, self.rotated_path)
+
+    def _write_snapshot(self, snapshot):
+        fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_path.parent, prefix=".search_history.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json_codec.dumpb(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _load(self):
+        """Snapshot, then any rotated journal, then the live journal"""
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, "rb") as f:
+                    self.data = {k: as_record(v) for k, v in json_codec.loads(f.read()).items()}
+            except (OSError, ValueError):
+                self.data = {}
+
+        leftovers = [p for p in (self.rotated_path, self.journal_path) if p.exists()]
+        for path in leftovers:
+            self._replay(path)
+
+        # Start from a clean snapshot (also drops any torn final line)
+        if leftovers:
+            self.compact()
+
+    def _replay(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json_codec.loads(line)
+                except ValueError:
+                    continue  # Torn final line from a crash mid-append
+                if record.get("reset"):
+                    self.data.clear()
+                elif "k" in record:
+                    self.data[record["k"]] = as_record(record.get("v"))
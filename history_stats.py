@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+History Analytics
+Aggregate statistics over a columnar history (see history_columns):
+follower percentiles, engagement-rate distribution, verified / business
+ratios and account-age buckets. Every figure is a vectorized NumPy
+operation over whole columns (NumPy is a requirement); the plain-Python
+path only exists as a fallback for environments without it.
+"""
+
+import math
+from bisect import bisect_right
+
+from history_columns import percentile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (25, 50, 75, 90, 99)
+
+# Upper bounds of the engagement-rate buckets, in percent
+ENGAGEMENT_BOUNDS = (1, 3, 6, 10)
+ENGAGEMENT_LABELS = ("< 1%", "1–3%", "3–6%", "6–10%", "10%+")
+
+# Account age from post count: posts below AGE_BOUNDS[i] -> AGE_LABELS[i]
+AGE_BOUNDS = (10, 50, 200, 500)
+AGE_LABELS = (
+    "Very New / Low Activity",
+    "New (< 50 posts)",
+    "Somewhat Established (50-200 posts)",
+    "Established (200-500 posts)",
+    "Very Active / Old (500+ posts)",
+)
+
+
+def account_age_bucket(posts):
+    """Account-age label for a post count (unknown counts as 0)"""
+    return AGE_LABELS[bisect_right(AGE_BOUNDS, posts or 0)]
+
+
+def engagement_rate(likes, followers, posts):
+    """Likes per follower per post, in percent (TikTokScraper._enhance_info), or None"""
+    if (followers or 0) <= 0 or (posts or 0) <= 0:
+        return None
+    return likes / (followers * posts) * 100
+
+
+def compute_stats(columns, platform=None):
+    """
+    Statistics over a ColumnarHistory, optionally for one platform
+    (matched case-insensitively against the profiles' platform field)
+    """
+    if np is not None:
+        return _compute_numpy(columns, platform)
+    return _compute_python(columns, platform)
+
+
+def _compute_numpy(columns, platform):
+    followers = columns.column("followers")
+    posts = columns.column("posts_count")
+    likes = columns.column("likes")
+    verified = columns.column("is_verified")
+    business = columns.column("is_business_account")
+
+    if platform:
+        codes, labels = columns.categories("platform")
+        wanted = [code for code, label in enumerate(labels) if label.lower() == platform.lower()]
+        keep = np.isin(codes, wanted)
+        followers, posts, likes = followers[keep], posts[keep], likes[keep]
+        verified, business = verified[keep], business[keep]
+
+    known_followers = followers[~np.isnan(followers)]
+    rated = (followers > 0) & (posts > 0) & ~np.isnan(likes)
+    rates = likes[rated] / (followers[rated] * posts[rated]) * 100
+    ages = np.bincount(np.searchsorted(AGE_BOUNDS, np.nan_to_num(posts), side="right"), minlength=len(AGE_LABELS))
+
+    return {
+        "profiles": int(followers.size),
+        "followers": _percentiles_numpy(known_followers),
+        "engagement": _percentiles_numpy(rates),
+        "engagement_buckets": dict(zip(
+            ENGAGEMENT_LABELS,
+            np.bincount(np.searchsorted(ENGAGEMENT_BOUNDS, rates, side="right"), minlength=len(ENGAGEMENT_LABELS)).tolist(),
+        )),
+        "verified_ratio": _ratio_numpy(verified),
+        "business_ratio": _ratio_numpy(business),
+        "account_age": dict(zip(AGE_LABELS, ages.tolist())),
+    }
+
+
+def _percentiles_numpy(values):
+    if not values.size:
+        return {"count": 0}
+    result = {"count": int(values.size), "mean": float(values.mean())}
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        result[f"p{q}"] = float(value)
+    return result
+
+
+def _ratio_numpy(flags):
+    known = flags >= 0
+    count = int(known.sum())
+    return float((flags == 1).sum() / count) if count else None
+
+
+def _compute_python(columns, platform):
+    rows = zip(
+        columns.column("followers"),
+        columns.column("posts_count"),
+        columns.column("likes"),
+        columns.column("is_verified"),
+        columns.column("is_business_account"),
+    )
+    if platform:
+        codes, labels = columns.categories("platform")
+        wanted = {code for code, label in enumerate(labels) if label.lower() == platform.lower()}
+        rows = (row for row, code in zip(rows, codes) if code in wanted)
+
+    profiles = 0
+    known_followers = []
+    rates = []
+    verified = [0, 0]  # [known, true]
+    business = [0, 0]
+    ages = [0] * len(AGE_LABELS)
+    engagement_buckets = [0] * len(ENGAGEMENT_LABELS)
+
+    for followers, posts, likes, is_verified, is_business in rows:
+        profiles += 1
+        if not math.isnan(followers):
+            known_followers.append(followers)
+        if followers > 0 and posts > 0 and not math.isnan(likes):
+            rate = likes / (followers * posts) * 100
+            rates.append(rate)
+            engagement_buckets[bisect_right(ENGAGEMENT_BOUNDS, rate)] += 1
+        ages[bisect_right(AGE_BOUNDS, 0 if math.isnan(posts) else posts)] += 1
+        for counter, flag in ((verified, is_verified), (business, is_business)):
+            if flag >= 0:
+                counter[0] += 1
+                counter[1] += flag == 1
+
+    return {
+        "profiles": profiles,
+        "followers": _percentiles_python(known_followers),
+        "engagement": _percentiles_python(rates),
+        "engagement_buckets": dict(zip(ENGAGEMENT_LABELS, engagement_buckets)),
+        "verified_ratio": verified[1] / verified[0] if verified[0] else None,
+        "business_ratio": business[1] / business[0] if business[0] else None,
+        "account_age": dict(zip(AGE_LABELS, ages)),
+    }
+
+
+def _percentiles_python(values):
+    if not values:
+        return {"count": 0}
+    values.sort()
+    result = {"count": len(values), "mean": math.fsum(values) / len(values)}
+    for q in PERCENTILES:
+        result[f"p{q}"] = percentile(values, q)
+    return result
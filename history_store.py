@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Indexed Search History Store
+SQLite-backed history partitioned by Telegram user, so history, export
+and clear only ever touch the caller's rows. Bios are full-text indexed
+(see bio_index) in the same database and transaction as each write.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import json_codec
+from bio_index import BioIndex
+from history_columns import ColumnarHistory, NUMERIC_COLUMNS, FLAG_COLUMNS, CATEGORY_COLUMNS, TEXT_COLUMNS
+from name_index import NameIndex
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_user_id INTEGER NOT NULL,
+    platform TEXT NOT NULL,
+    username TEXT NOT NULL,
+    searched_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (telegram_user_id, platform, username)
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_platform_username_time
+    ON search_history (telegram_user_id, platform, username, searched_at);
+CREATE INDEX IF NOT EXISTS idx_history_user_time
+    ON search_history (telegram_user_id, searched_at);
+CREATE TABLE IF NOT EXISTS history_versions (
+    telegram_user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+_BUMP_VERSION = """
+INSERT INTO history_versions (telegram_user_id, version) VALUES (?, 1)
+ON CONFLICT (telegram_user_id) DO UPDATE SET version = version + 1
+"""
+
+# Display-only keys added by the cache layer, never persisted
+_TRANSIENT_KEYS = ("is_stale", "cache_age_seconds")
+
+COLUMN_CACHE_USERS = 32  # Users whose in-memory views (columns, name index) are kept
+# Profile fields pulled out of the stored JSON by SQLite when building views
+_COLUMN_FIELDS = tuple(dict.fromkeys(NUMERIC_COLUMNS + FLAG_COLUMNS + CATEGORY_COLUMNS + TEXT_COLUMNS))
+_NAME_FIELDS = ("platform", "username", "full_name", "followers")
+
+
+class HistoryStore:
+    """Per-user search history in SQLite (WAL mode)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._views = OrderedDict()  # (kind, user_id) -> (version, view), LRU
+        self._views_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        # One index scope per Telegram user; keys are "<platform>:<username>"
+        self._bio_index = BioIndex(connect=self._conn)
+        self._bio_synced = set()  # Users whose rows from before the index are caught up
+        self._bio_synced_lock = threading.Lock()
+
+    def add(self, user_id, platform, info):
+        """Record a lookup (the latest lookup of a username replaces the earlier one)"""
+        username = (info.get("username") or "").lower()
+        if not username:
+            return
+        data = {k: v for k, v in info.items() if k not in _TRANSIENT_KEYS}
+        conn = self._conn()
+        version = None
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO search_history (telegram_user_id, platform, username, searched_at, data)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (telegram_user_id, platform, username)
+                DO UPDATE SET searched_at = excluded.searched_at, data = excluded.data
+                """,
+                (user_id, platform, username, time.time(), json_codec.dumps(data)),
+            )
+            conn.execute(_BUMP_VERSION, (user_id,))
+            self._bio_index.add(f"{platform}:{username}", data, scope=user_id, conn=conn)
+            if self._has_views(user_id):
+                version = self._read_version(conn, user_id)
+        if version is not None:
+            self._update_views(user_id, version, (platform, username), data)
+
+    def history(self, user_id, platform=None, limit=None, offset=0):
+        """The user's lookups, oldest first"""
+        return list(self.iter_history(user_id, platform, limit=limit, offset=offset))
+
+    def iter_history(self, user_id, platform=None, chunk_size=1000, limit=None, offset=0):
+        """Stream the user's lookups in chunks, oldest first"""
+        sql, params = self._select("data", user_id, platform)
+        sql += " ORDER BY searched_at, id LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+
+        cursor = self._conn().execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield json_codec.loads(data)
+
+    def count(self, user_id, platform=None):
+        """Number of stored lookups for the user"""
+        sql, params = self._select("COUNT(*)", user_id, platform)
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def clear(self, user_id, platform=None):
+        """Delete the user's history (optionally for one platform only)"""
+        sql, params = self._select(None, user_id, platform)
+        conn = self._conn()
+        with conn:
+            deleted = conn.execute(sql, params).rowcount
+            if deleted:
+                conn.execute(_BUMP_VERSION, (user_id,))
+            self._bio_index.clear(user_id, f"{platform}:" if platform else "", conn=conn)
+        with self._views_lock:
+            for kind in ("columns", "names"):
+                self._views.pop((kind, user_id), None)
+        return deleted
+
+    def search_bios(self, user_id, query, limit=None, offset=0):
+        """
+        (total, profiles) of the user's lookups whose bio, hashtags or linked
+        accounts match a bio_index query, oldest indexed first
+        Raises bio_index.QuerySyntaxError for a malformed query
+        """
+        self._sync_bios(user_id)
+        total, keys = self._bio_index.search_page(query, scope=user_id, limit=limit, offset=offset)
+        conn = self._conn()
+        profiles = []
+        for key in keys:
+            platform, username = key.split(":", 1)
+            row = conn.execute(
+                "SELECT data FROM search_history WHERE telegram_user_id = ? AND platform = ? AND username = ?",
+                (user_id, platform, username),
+            ).fetchone()
+            if row is not None:
+                profile = json_codec.loads(row[0])
+                profile.setdefault("platform", platform)
+                profiles.append(profile)
+        return total, profiles
+
+    def _sync_bios(self, user_id):
+        """Index the user's rows saved before the bio index existed (once per process)"""
+        with self._bio_synced_lock:
+            if user_id in self._bio_synced:
+                return
+            conn = self._conn()
+            # Write-locked from reading the rows to indexing them, so no add() slips in between
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT platform, username, data FROM search_history WHERE telegram_user_id = ?", (user_id,)
+                )
+                self._bio_index.sync(
+                    ((f"{platform}:{username}", json_codec.loads(data)) for platform, username, data in rows),
+                    scope=user_id,
+                )
+            except BaseException:
+                conn.rollback()
+                raise
+            self._bio_synced.add(user_id)
+
+    def version(self, user_id):
+        """
+        Change counter for the user's history (0 if never written)
+        Bumped in the same transaction as every add and clear, so equal
+        versions mean identical history
+        """
+        return self._read_version(self._conn(), user_id)
+
+    def columns(self, user_id):
+        """
+        Columnar view of the user's whole history (see history_columns)
+        Kept in memory for recently used users and updated in place by
+        add(); rebuilt when the history changed some other way. Rows are
+        keyed by (platform, username).
+        """
+        return self._view("columns", user_id, ColumnarHistory, _COLUMN_FIELDS)
+
+    def name_index(self, user_id):
+        """
+        Prefix / fuzzy name search over the user's history (see name_index)
+        Cached and kept up to date like columns(); keyed by (platform, username)
+        """
+        return self._view("names", user_id, NameIndex, _NAME_FIELDS)
+
+    def _view(self, kind, user_id, factory, fields):
+        """Cached in-memory view of the user's history, rebuilt when stale"""
+        version = self.version(user_id)
+        with self._views_lock:
+            cached = self._views.get((kind, user_id))
+            if cached is not None and cached[0] == version:
+                self._views.move_to_end((kind, user_id))
+                return cached[1]
+
+        extract = ", ".join(f"json_extract(data, '$.{name}')" for name in fields)
+        sql, params = self._select(f"platform, username, {extract}", user_id, None)
+        cursor = self._conn().execute(sql + " ORDER BY searched_at, id", params)
+        view = factory(((row[0], row[1]), dict(zip(fields, row[2:]))) for row in cursor)
+
+        with self._views_lock:
+            self._views[(kind, user_id)] = (version, view)
+            self._views.move_to_end((kind, user_id))
+            while len(self._views) > COLUMN_CACHE_USERS * 2:
+                self._views.popitem(last=False)
+        return view
+
+    def _has_views(self, user_id):
+        return ("columns", user_id) in self._views or ("names", user_id) in self._views
+
+    def _update_views(self, user_id, version, key, data):
+        """Apply one add() to the user's cached views, dropping any that missed a write"""
+        with self._views_lock:
+            for kind in ("columns", "names"):
+                cached = self._views.get((kind, user_id))
+                if cached is None:
+                    continue
+                if cached[0] != version - 1:
+                    del self._views[(kind, user_id)]
+                    continue
+                cached[1].append(key, data)
+                self._views[(kind, user_id)] = (version, cached[1])
+
+    @staticmethod
+    def _read_version(conn, user_id):
+        row = conn.execute(
+            "SELECT version FROM history_versions WHERE telegram_user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _select(self, columns, user_id, platform):
+        """SQL prefix plus parameters scoped to one user (and platform)"""
+        head = "DELETE FROM search_history" if columns is None else f"SELECT {columns} FROM search_history"
+        sql = head + " WHERE telegram_user_id = ?"
+        params = [user_id]
+        if platform:
+            sql += " AND platform = ?"
+            params.append(platform)
+        return sql, params
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide history store at HISTORY_DB (default ./output/history.sqlite3)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(os.getenv("HISTORY_DB", "./output/history.sqlite3"))
+    return _store
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Transport
+One process-wide requests session with keep-alive connection pools per host,
+plus a non-blocking httpx client for the asyncio lookup path
+"""
+
+import os
+import threading
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive pool size for each upstream host
+POOL_SIZES = {
+    "instagram-scraper-api2.p.rapidapi.com": 32,
+    "tiktok-api23.p.rapidapi.com": 32,
+    "www.tiktok.com": 8,
+}
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Limits for the async client (shared by all hosts)
+ASYNC_MAX_CONNECTIONS = int(os.getenv("HTTP_ASYNC_MAX_CONNECTIONS", "200"))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("HTTP_ASYNC_MAX_KEEPALIVE", "64"))
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+
+
+def get_session():
+    """
+    Get the shared requests session
+    Connections are reused across lookups, so only the first call
+    to each host pays for the TCP and TLS handshake
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session():
+    """Close the shared session and drop all pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _build_session():
+    """Create a session with one connection pool per known host"""
+    session = requests.Session()
+
+    default_adapter = HTTPAdapter(pool_connections=len(POOL_SIZES) + 4, pool_maxsize=DEFAULT_POOL_SIZE)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+
+    # Longest prefix wins, so these override the default adapter per host
+    for host, size in POOL_SIZES.items():
+        session.mount(f"https://{host}/", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+
+    return session
+
+
+def get_async_client():
+    """
+    Get the shared httpx async client
+    Must be called from inside the running event loop that will use it
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """Close the shared async client (call on bot shutdown)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -4,43 +4,67 @@ Instagram RapidAPI Scraper
 Fast, reliable Instagram user data extraction using RapidAPI
 """
 
+import httpx
 import requests
-import json
 import os
-import time
 from datetime import datetime
 from pathlib import Path
+from http_session import get_session, get_async_client
+from singleflight import inflight, flight_key
+from backoff import backoff
+from profile_cache import profile_cache, cache_key, mark_stale
+from history_journal import open_journal
+from excel_export import write_excel_streaming
+from json_codec import decode_response, InstagramPayload
+from profile_record import ProfileRecord
 
 class InstagramRapidAPIScraper:
     """Instagram scraper using RapidAPI endpoint"""
     
-    def __init__(self):
+    def __init__(self, stale_while_revalidate=False, record_history=True):
         self.rapidapi_key = os.getenv("RAPIDAPI_KEY", "")
         self.rapidapi_host = "instagram-scraper-api2.p.rapidapi.com"
+        self.api_url = "https://instagram-scraper-api2.p.rapidapi.com/v1/info"
         self.output_dir = Path("./output")
         self.output_dir.mkdir(exist_ok=True)
         self.search_history_file = self.output_dir / "search_history.json"
+        # Callers with their own history store (the bot) skip the shared journal
+        self.history_journal = open_journal(self.search_history_file) if record_history else None
         self.search_history = self.load_search_history()
-        self._cache = {}
-        self._cache_ttl = 3600  # 1 hour
+        self._cache = profile_cache
+        # Serve expired cache entries instantly and refresh them in the background
+        self.stale_while_revalidate = stale_while_revalidate
     
     def load_search_history(self):
-        """Load search history from JSON"""
-        if self.search_history_file.exists():
-            try:
-                with open(self.search_history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """Load search history (snapshot plus journal)"""
+        if self.history_journal is None:
+            return {}
+        return self.history_journal.data
     
     def save_search_history(self):
-        """Save search history to JSON"""
+        """Rewrite the full search history snapshot (use record_search for single lookups)"""
+        if self.history_journal is None:
+            return
         try:
-            with open(self.search_history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.search_history, f, ensure_ascii=False, indent=2)
+            self.history_journal.replace(self.search_history)
         except:
             pass
+        self.search_history = self.history_journal.data
+    
+    def record_search(self, username, info):
+        """Append one lookup to the search history journal"""
+        if self.history_journal is None:
+            return
+        try:
+            self.history_journal.append(username, info)
+        except:
+            pass
+    
+    def export_search_history_to_excel(self, filename="instagram_search_results.xlsx"):
+        """Stream the search history to a formatted Excel file"""
+        if not self.search_history:
+            return None
+        return write_excel_streaming(list(self.search_history.values()), self.output_dir / filename)
     
     def get_user_info(self, username, timeout=10):
         """
@@ -51,86 +75,141 @@ class InstagramRapidAPIScraper:
             username = username.lstrip('@')
             
             # Check cache first
-            cached = self._cache_get(f"instagram:{username}")
+            cached = self._cache.get(cache_key("instagram", username))
             if cached:
                 return cached
             
             if not self.rapidapi_key:
                 return {"error": "❌ RAPIDAPI_KEY not configured. Contact admin."}
             
-            # Call RapidAPI endpoint
-            url = "https://instagram-scraper-api2.p.rapidapi.com/v1/info"
-            headers = {
-                "x-rapidapi-host": self.rapidapi_host,
-                "x-rapidapi-key": self.rapidapi_key,
-                "accept": "application/json"
-            }
-            params = {"username_or_id_or_url": username}
+            if self.stale_while_revalidate:
+                stale = self._get_stale(username)
+                if stale:
+                    inflight.do_background(flight_key("instagram", username), lambda: self._fetch(username, timeout))
+                    return stale
             
-            response = requests.get(url, headers=headers, params=params, timeout=timeout)
+            # Call RapidAPI endpoint (shared with concurrent lookups of the same user)
+            return inflight.do(flight_key("instagram", username), lambda: self._fetch(username, timeout))
+        
+        except requests.Timeout:
+            return {"error": "⏱️ Request timeout (10s). Try again later."}
+        except Exception as e:
+            return {"error": f"❌ Error: {str(e)[:100]}"}
+    
+    async def get_user_info_async(self, username, timeout=10):
+        """
+        Non-blocking version of get_user_info for the asyncio bot
+        Runs on the shared httpx client, so no worker thread is needed
+        """
+        try:
+            username = username.lstrip('@')
             
-            if response.status_code == 200:
-                data = response.json()
-                info = self._parse_response(data, username)
-                
-                if info and "error" not in info:
-                    # Save to history and cache
-                    self.search_history[username] = info
-                    self.save_search_history()
-                    self._cache_set(f"instagram:{username}", info)
-                    return info
+            cached = self._cache.get(cache_key("instagram", username))
+            if cached:
+                return cached
             
-            if response.status_code == 404:
-                return {"error": "❌ Instagram user not found"}
+            if not self.rapidapi_key:
+                return {"error": "❌ RAPIDAPI_KEY not configured. Contact admin."}
             
-            if response.status_code == 429:
-                return {"error": "⏱️ RapidAPI rate limit. Try again in 1 minute."}
+            if self.stale_while_revalidate:
+                stale = self._get_stale(username)
+                if stale:
+                    inflight.do_background_async(flight_key("instagram", username), lambda: self._fetch_async(username, timeout))
+                    return stale
             
-            return {"error": f"❌ API error: HTTP {response.status_code}"}
+            return await inflight.do_async(flight_key("instagram", username), lambda: self._fetch_async(username, timeout))
         
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return {"error": "⏱️ Request timeout (10s). Try again later."}
         except Exception as e:
             return {"error": f"❌ Error: {str(e)[:100]}"}
     
-    def _parse_response(self, data, username):
-        """Parse RapidAPI response"""
+    def _get_stale(self, username):
+        """Expired (but not too old) cached profile, marked with its age"""
+        hit = self._cache.get_stale(cache_key("instagram", username))
+        if hit is None:
+            return None
+        return mark_stale(*hit)
+    
+    def _fetch(self, username, timeout):
+        """Call RapidAPI and handle the response"""
+        if backoff.remaining("instagram"):
+            return self._rate_limited()
+        response = get_session().get(self.api_url, headers=self._headers(), params=self._params(username), timeout=timeout)
+        return self._handle_response(response, username)
+    
+    async def _fetch_async(self, username, timeout):
+        """Call RapidAPI on the async client and handle the response"""
+        if backoff.remaining("instagram"):
+            return self._rate_limited()
+        response = await get_async_client().get(self.api_url, headers=self._headers(), params=self._params(username), timeout=timeout)
+        return self._handle_response(response, username)
+    
+    def _rate_limited(self):
+        """Error for lookups made inside the platform's backoff window"""
+        wait = int(backoff.remaining("instagram")) + 1
+        return {"error": f"⏱️ RapidAPI rate limit. Try again in {wait}s."}
+    
+    def _headers(self):
+        """RapidAPI request headers"""
+        return {
+            "x-rapidapi-host": self.rapidapi_host,
+            "x-rapidapi-key": self.rapidapi_key,
+            "accept": "application/json"
+        }
+    
+    def _params(self, username):
+        """RapidAPI query parameters"""
+        return {"username_or_id_or_url": username}
+    
+    def _handle_response(self, response, username):
+        """Turn a RapidAPI response (requests or httpx) into user info or an error"""
+        if response.status_code == 200:
+            payload = decode_response(response, InstagramPayload)
+            info = self._parse_response(payload, username)
+            
+            if info and "error" not in info:
+                # Save to history and cache
+                self.record_search(username, info)
+                self._cache.set(cache_key("instagram", username), info)
+                return info
+        
+        if response.status_code == 404:
+            # Remember misses briefly so typos and repeats skip the API
+            error = {"error": "❌ Instagram user not found"}
+            self._cache.set(cache_key("instagram", username), error, negative=True)
+            return error
+        
+        if response.status_code == 429:
+            # Back off the whole platform instead of letting every lookup fail upstream
+            backoff.trip("instagram", response.headers.get("Retry-After"))
+            return self._rate_limited()
+        
+        return {"error": f"❌ API error: HTTP {response.status_code}"}
+    
+    def _parse_response(self, payload, username):
+        """Parse a decoded InstagramPayload"""
         try:
-            if not data or not data.get("data"):
+            user = payload.data if payload else None
+            if user is None:
                 return None
             
-            user = data["data"]
-            
-            return {
+            return ProfileRecord({
                 "platform": "Instagram",
-                "account_id": user.get("pk") or user.get("id", "N/A"),
-                "username": user.get("username") or username,
-                "full_name": user.get("full_name") or user.get("name", "N/A"),
-                "followers": user.get("follower_count") or user.get("followers", 0),
-                "following": user.get("following_count") or user.get("following", 0),
-                "bio": user.get("biography") or user.get("bio", ""),
-                "full_location": user.get("city") or user.get("location", "N/A"),
-                "posts_count": user.get("media_count") or user.get("posts", 0),
-                "is_verified": user.get("is_verified") or False,
-                "is_public": not user.get("is_private", False),
-                "is_business_account": user.get("is_business_account") or False,
-                "external_url": user.get("external_url") or user.get("website", "N/A"),
-                "profile_pic": user.get("profile_pic_url", "N/A"),
+                "account_id": user.pk or user.id or "N/A",
+                "username": user.username or username,
+                "full_name": user.full_name or user.name or "N/A",
+                "followers": user.follower_count or user.followers or 0,
+                "following": user.following_count or user.following or 0,
+                "bio": user.biography or user.bio or "",
+                "full_location": user.city or user.location or "N/A",
+                "posts_count": user.media_count or user.posts or 0,
+                "is_verified": user.is_verified or False,
+                "is_public": not user.is_private,
+                "is_business_account": user.is_business_account or False,
+                "external_url": user.external_url or user.website or "N/A",
+                "profile_pic": user.profile_pic_url or "N/A",
                 "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            })
         except:
             return None
-    
-    def _cache_get(self, key):
-        """Get from cache if fresh"""
-        if key in self._cache:
-            cached_data, timestamp = self._cache[key]
-            if time.time() - timestamp < self._cache_ttl:
-                return cached_data
-            else:
-                del self._cache[key]
-        return None
-    
-    def _cache_set(self, key, data):
-        """Store in cache with timestamp"""
-        self._cache[key] = (data, time.time())
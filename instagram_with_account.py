@@ -5,11 +5,13 @@ Allows using Instagram account credentials for better performance
 """
 
 import instaloader
-import time
 import os
-import json
 from pathlib import Path
 from datetime import datetime
+from profile_cache import profile_cache, cache_key
+from backoff import backoff
+from history_journal import open_journal
+from profile_record import ProfileRecord
 
 class InstagramScraperWithAccount:
     """Instagram scraper with optional account login"""
@@ -21,25 +23,26 @@ class InstagramScraperWithAccount:
         self.output_dir.mkdir(exist_ok=True)
         self.search_history_file = self.output_dir / "search_history.json"
         self.loader = None
+        self.history_journal = open_journal(self.search_history_file)
         self.search_history = self.load_search_history()
-        self._cache = {}
-        self._cache_ttl = 3600  # 1 hour
+        self._cache = profile_cache
     
     def load_search_history(self):
-        """Load search history"""
-        if self.search_history_file.exists():
-            try:
-                with open(self.search_history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """Load search history (snapshot plus journal)"""
+        return self.history_journal.data
     
     def save_search_history(self):
-        """Save search history"""
+        """Rewrite the full search history snapshot (use record_search for single lookups)"""
         try:
-            with open(self.search_history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.search_history, f, ensure_ascii=False, indent=2)
+            self.history_journal.replace(self.search_history)
+        except:
+            pass
+        self.search_history = self.history_journal.data
+    
+    def record_search(self, username, info):
+        """Append one lookup to the search history journal"""
+        try:
+            self.history_journal.append(username, info)
         except:
             pass
     
@@ -79,10 +82,15 @@ class InstagramScraperWithAccount:
             username = username.lstrip('@')
             
             # Check cache
-            cached = self._cache_get(f"instagram:{username}")
+            cached = self._cache.get(cache_key("instagram", username, "instaloader"))
             if cached:
                 return cached
             
+            # Still inside a rate-limit window from an earlier 429
+            wait = backoff.remaining("instagram:instaloader")
+            if wait:
+                return {"error": f"⏱️ Instagram rate limit. Try again in {int(wait) + 1}s."}
+            
             # Create loader if not exists
             if self.loader is None:
                 self.loader = instaloader.Instaloader(
@@ -94,7 +102,7 @@ class InstagramScraperWithAccount:
             # Get profile
             profile = self.loader.context.username_to_profile(username)
             
-            info = {
+            info = ProfileRecord({
                 "platform": "Instagram",
                 "username": profile.username,
                 "full_name": profile.full_name,
@@ -108,7 +116,7 @@ class InstagramScraperWithAccount:
                 "is_business_account": profile.is_business_account,
                 "external_url": profile.external_url or "N/A",
                 "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            })
             
             # Add account ID if available
             if hasattr(profile, 'userid'):
@@ -121,29 +129,24 @@ class InstagramScraperWithAccount:
                 info["business_address"] = "N/A"
             
             # Auto-save
-            self.search_history[username] = info
-            self.save_search_history()
-            self._cache_set(f"instagram:{username}", info)
+            self.record_search(username, info)
+            self._cache.set(cache_key("instagram", username, "instaloader"), info)
             
             return info
         
         except instaloader.exceptions.ProfileNotExistsException:
-            return {"error": "❌ Instagram user not found"}
+            return self._negative(username, {"error": "❌ Instagram user not found"})
         except instaloader.exceptions.PrivateProfileNotFollowedException:
-            return {"error": "❌ This account is private"}
+            return self._negative(username, {"error": "❌ This account is private"})
+        except instaloader.exceptions.TooManyRequestsException:
+            backoff.trip("instagram:instaloader")
+            return {"error": "⏱️ Instagram rate limit. Try again in 1 minute."}
         except instaloader.exceptions.InstaloaderException as e:
             return {"error": f"❌ Instagram error: {str(e)[:80]}"}
         except Exception as e:
             return {"error": f"❌ Error: {str(e)[:80]}"}
     
-    def _cache_get(self, key):
-        if key in self._cache:
-            cached_data, timestamp = self._cache[key]
-            if time.time() - timestamp < self._cache_ttl:
-                return cached_data
-            else:
-                del self._cache[key]
-        return None
-    
-    def _cache_set(self, key, data):
-        self._cache[key] = (data, time.time())
+    def _negative(self, username, error):
+        """Cache a not-found/private result briefly and return it"""
+        self._cache.set(cache_key("instagram", username, "instaloader"), error, negative=True)
+        return error
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+JSON Codec
+One JSON layer for API responses, caches and history files: orjson when
+installed, else msgspec, else the stdlib json module. RapidAPI payloads
+can be decoded straight into typed structs holding only the fields the
+scrapers read.
+"""
+
+import json
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+BACKEND = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+
+
+def _default(value):
+    """Fallback for values JSON has no type for (sets become lists, records dicts, the rest str)"""
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def dumpb(obj):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. integers past 64 bits: let the stdlib handle them
+    elif msgspec is not None:
+        try:
+            return _msgspec_encoder.encode(obj)
+        except (TypeError, OverflowError):
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps(obj):
+    """Compact JSON text (non-ASCII kept as is)"""
+    return dumpb(obj).decode("utf-8")
+
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return _msgspec_decoder.decode(data)
+    return json.loads(data)
+
+
+# ============ TYPED PAYLOADS ============
+
+class _Record:
+    """Stdlib fallback for a msgspec Struct: slotted, every field defaults to None"""
+
+    __slots__ = ()
+    _nested = {}
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_obj(cls, obj):
+        if not isinstance(obj, dict):
+            raise ValueError(f"Expected an object for {cls.__name__}, got {type(obj).__name__}")
+        record = cls.__new__(cls)
+        for field in cls.__slots__:
+            value = obj.get(field)
+            nested = cls._nested.get(field)
+            if nested is not None and value is not None:
+                value = nested.from_obj(value)
+            setattr(record, field, value)
+        return record
+
+    def __repr__(self):
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def _struct(name, fields, nested=None):
+    """
+    Payload type with the given fields (all optional, default None)
+    nested maps a field to another payload type decoded in place
+    """
+    nested = nested or {}
+    if msgspec is not None:
+        return msgspec.defstruct(
+            name,
+            [(f, Optional[nested[f]] if f in nested else Any, None) for f in fields],
+        )
+    return type(name, (_Record,), {"__slots__": tuple(fields), "_nested": nested})
+
+
+_TIKTOK_USER_FIELDS = (
+    "id", "uid", "uniqueId", "nickname", "followerCount", "followingCount",
+    "signature", "region", "videoCount", "heartCount", "verified",
+    "privateAccount", "businessAccountStatus", "bioLink", "avatarLarger",
+)
+
+InstagramUser = _struct("InstagramUser", (
+    "pk", "id", "username", "full_name", "name", "follower_count", "followers",
+    "following_count", "following", "biography", "bio", "city", "location",
+    "media_count", "posts", "is_verified", "is_private", "is_business_account",
+    "external_url", "website", "profile_pic_url",
+))
+InstagramPayload = _struct("InstagramPayload", ("data",), {"data": InstagramUser})
+
+TikTokUser = _struct("TikTokUser", _TIKTOK_USER_FIELDS)
+TikTokStats = _struct("TikTokStats", ("followerCount", "followingCount", "videoCount", "heartCount"))
+# Some endpoints nest the user under data / user, others return it at the top level
+TikTokPayload = _struct(
+    "TikTokPayload",
+    _TIKTOK_USER_FIELDS + ("data", "user", "stats"),
+    {"data": TikTokUser, "user": TikTokUser, "stats": TikTokStats},
+)
+
+_typed_decoders = {}
+
+
+def decode(data, into=None):
+    """
+    Decode JSON bytes / str, into an instance of a payload type when given
+    Fields the type does not declare are skipped; raises ValueError on
+    malformed JSON or a payload of the wrong shape
+    """
+    if into is None:
+        return loads(data)
+    if msgspec is not None:
+        decoder = _typed_decoders.get(into)
+        if decoder is None:
+            decoder = _typed_decoders[into] = msgspec.json.Decoder(into)
+        return decoder.decode(data)
+    return into.from_obj(loads(data))
+
+
+def decode_response(response, into=None):
+    """Body of a requests / httpx response, decoded (see decode)"""
+    return decode(response.content, into)
+
+
+def _benchmark(rounds=2000):
+    """Compare this backend with the stdlib json module on a RapidAPI-sized payload"""
+    import time
+
+    user = {name: f"value {name} ✓" for name in _TIKTOK_USER_FIELDS}
+    user.update({"followerCount": 123456, "verified": True, "bioLink": {"link": "https://example.com"}})
+    extra = {f"unused_{i}": {"nested": list(range(20)), "text": "x" * 40} for i in range(40)}
+    payload = {"data": dict(user, **extra), "stats": {"followerCount": 123456}, "extra": extra}
+    raw = json.dumps(payload).encode("utf-8")
+    history = {f"user{i}": dict(user, username=f"user{i}") for i in range(1000)}
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return (time.perf_counter() - start) / rounds * 1e6
+
+    cases = [
+        ("decode response", lambda: json.loads(raw), lambda: loads(raw)),
+        ("decode to TikTokPayload", lambda: json.loads(raw), lambda: decode(raw, TikTokPayload)),
+        ("encode profile", lambda: json.dumps(user, ensure_ascii=False), lambda: dumps(user)),
+    ]
+    print(f"backend: {BACKEND} ({len(raw)} byte payload, {rounds} rounds)")
+    for label, baseline, candidate in cases:
+        before, after = timed(baseline), timed(candidate)
+        print(f"  {label:<24} json {before:8.1f}µs  {BACKEND} {after:8.1f}µs  x{before / after:.1f}")
+
+    rounds = max(1, rounds // 100)
+    before = timed(lambda: json.dumps(history, ensure_ascii=False, indent=2))
+    after = timed(lambda: dumpb(history))
+    print(f"  {'save 1k-entry history':<24} json {before:8.1f}µs  {BACKEND} {after:8.1f}µs  x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
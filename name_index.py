@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Name Search Index
+Prefix and fuzzy (trigram) search over usernames and full names.
+Names are normalized first (see text_normalize), so case, accents and
+Arabic spelling variants do not matter. Maintained incrementally: each
+append() re-indexes a single profile.
+"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from text_normalize import normalize
+
+MIN_SIMILARITY = 0.5  # Trigram Jaccard similarity a fuzzy match needs, per query word
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+class NameIndex:
+    """
+    Search index over (key, profile) pairs, e.g. a user's history
+    Each profile is indexed under its whole username plus every word of
+    its username and full name. search() returns prefix matches first,
+    then fuzzy matches ranked by trigram similarity: every query word must
+    share enough trigrams with some term of the profile, measured against
+    both trigram sets (Jaccard), so a short shared prefix is not enough.
+
+    Prefix lookups bisect a sorted list of the indexed terms (a flat trie:
+    all terms under a prefix are adjacent), which unlike a node-per-letter
+    trie costs no object per character.
+    """
+
+    def __init__(self, items=()):
+        self._lock = threading.Lock()
+        self._terms = {}  # term -> keys
+        self._sorted_terms = []
+        self._grams = {}  # trigram -> terms
+        self._gram_counts = {}  # term -> number of distinct trigrams
+        self._entries = {}  # key -> (terms, display)
+        for key, profile in items:
+            self._add(key, profile, keep_sorted=False)
+        self._sorted_terms = sorted(self._terms)
+
+    def append(self, key, profile):
+        """Index (or re-index) one profile"""
+        with self._lock:
+            self._add(key, profile)
+
+    def remove(self, key):
+        """Drop a profile from the index"""
+        with self._lock:
+            self._remove(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query, limit=10, offset=0):
+        """
+        (total, page) for a query; page holds up to limit display dicts
+        (key, username, full_name, platform, followers, match) from offset on
+        """
+        words = _terms(query)
+        if not words:
+            return 0, []
+
+        with self._lock:
+            # Every query word must prefix some term of the profile
+            prefix = None
+            for word in words:
+                keys = self._prefixed(word)
+                prefix = keys if prefix is None else prefix & keys
+                if not prefix:
+                    break
+            prefix = prefix or set()
+
+            # Every query word must also be similar to some term of the profile
+            similar = None
+            for word in words:
+                scores = self._similar(word)
+                if similar is None:
+                    similar = scores
+                else:
+                    similar = {key: similar[key] + score for key, score in scores.items() if key in similar}
+                if not similar:
+                    break
+
+            exact = set(words)
+            ranked = sorted(
+                prefix,
+                key=lambda k: (not exact & self._entries[k][0], len(self._entries[k][1]["username"]), k),
+            )
+            fuzzy = sorted((-score, key) for key, score in (similar or {}).items() if key not in prefix)
+
+            results = [(key, "prefix") for key in ranked] + [(key, "fuzzy") for _, key in fuzzy]
+            page = [
+                dict(self._entries[key][1], key=key, match=match)
+                for key, match in results[offset:offset + limit]
+            ]
+            return len(results), page
+
+    def _add(self, key, profile, keep_sorted=True):
+        self._remove(key)
+        username = profile.get("username") or ""
+        full_name = profile.get("full_name") or ""
+        if full_name == "N/A":
+            full_name = ""
+
+        terms = set(_terms(username) + _terms(full_name))
+        whole = normalize(username)
+        if whole:
+            terms.add(whole)
+
+        for term in terms:
+            keys = self._terms.get(term)
+            if keys is None:
+                keys = self._terms[term] = set()
+                if keep_sorted:
+                    insort(self._sorted_terms, term)
+                grams = _trigrams(term)
+                self._gram_counts[term] = len(grams)
+                for gram in grams:
+                    self._grams.setdefault(gram, set()).add(term)
+            keys.add(key)
+
+        display = {
+            "username": username,
+            "full_name": full_name,
+            "platform": profile.get("platform"),
+            "followers": profile.get("followers"),
+        }
+        self._entries[key] = (terms, display)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        terms, _ = entry
+        for term in terms:
+            keys = self._terms.get(term)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if keys:
+                continue
+            del self._terms[term]
+            del self._gram_counts[term]
+            # While __init__ is still loading, the sorted list is not built yet
+            i = bisect_left(self._sorted_terms, term)
+            if i < len(self._sorted_terms) and self._sorted_terms[i] == term:
+                del self._sorted_terms[i]
+            for gram in _trigrams(term):
+                terms_with_gram = self._grams.get(gram)
+                if terms_with_gram is not None:
+                    terms_with_gram.discard(term)
+                    if not terms_with_gram:
+                        del self._grams[gram]
+
+    def _similar(self, word):
+        """key -> similarity of its closest term to word, for keys at or above MIN_SIMILARITY"""
+        word_grams = _trigrams(word)
+        shared = Counter()
+        for gram in word_grams:
+            shared.update(self._grams.get(gram, ()))
+        scores = {}
+        gram_counts = self._gram_counts
+        for term, count in shared.items():
+            similarity = count / (len(word_grams) + gram_counts[term] - count)
+            if similarity < MIN_SIMILARITY:
+                continue
+            for key in self._terms[term]:
+                if similarity > scores.get(key, 0):
+                    scores[key] = similarity
+        return scores
+
+    def _prefixed(self, prefix):
+        """Keys with a term starting with prefix"""
+        keys = set()
+        terms = self._sorted_terms
+        for i in range(bisect_left(terms, prefix), len(terms)):
+            if not terms[i].startswith(prefix):
+                break
+            keys |= self._terms[terms[i]]
+        return keys
+
+
+def _terms(text):
+    """Normalized words of a name ("john_doe.99" -> john, doe, 99)"""
+    return _WORD.findall(normalize(text)) if text else []
+
+
+def _trigrams(term):
+    """Trigrams of a term, padded so short terms and word starts count"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Shared Profile Cache
+Bounded LRU cache with per-platform TTLs, shared by every scraper class,
+optionally backed by a persistent on-disk tier (see disk_cache.py)
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from disk_cache import DiskCache
+from profile_record import as_record
+
+# Freshness window per platform (seconds)
+PLATFORM_TTLS = {
+    "instagram": 3600,   # 1 hour
+    "tiktok": 86400,     # 24 hours
+}
+DEFAULT_TTL = 3600
+
+# How long past expiry an entry may still be served by get_stale (seconds)
+DEFAULT_MAX_STALE = 3600
+
+# Freshness window for negative results (not found, private account)
+DEFAULT_NEGATIVE_TTL = 300
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at", "size", "negative")
+
+    def __init__(self, value, stored_at, expires_at, size, negative=False):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.size = size
+        self.negative = negative
+
+
+class ProfileCache:
+    """
+    Thread-safe LRU + TTL cache
+    Keys look like "<platform>:<username>" (see cache_key); the platform
+    prefix picks the TTL. The cache is bounded by entry count and,
+    optionally, by an estimated byte budget. With a backing tier, memory
+    misses are read through from disk and every set is written behind.
+    Expired entries are kept for max_stale seconds so get_stale can serve
+    them while a refresh runs (stale-while-revalidate). Negative entries
+    (error results) use their own short TTL, stay in memory only and are
+    never served stale.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttls=None, default_ttl=DEFAULT_TTL, backing=None, max_stale=0,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(PLATFORM_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.backing = backing
+        self.max_stale = max_stale
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._counters = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value if fresh, else None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                # Past the stale window too: drop it for good
+                if entry.negative or now - entry.expires_at > self.max_stale:
+                    self._remove(key)
+                    self.expirations += 1
+                # The write-behind disk copy is never newer than memory: skip the read
+                self._count(key, "misses")
+                return None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._count(key, "hits")
+                return entry.value
+
+        entry = self._load(key, now)
+        with self._lock:
+            if entry is None:
+                self._count(key, "misses")
+                return None
+
+            self._insert(key, entry)
+            self._count(key, "disk_hits")
+            return entry.value
+
+    def get_stale(self, key, max_stale=None):
+        """
+        Return (value, age_seconds) for an entry that is fresh or expired
+        by at most max_stale seconds (defaults to the cache's max_stale),
+        else None
+        """
+        limit = self.max_stale if max_stale is None else max_stale
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is None:
+            entry = self._load(key, now, allow_stale=True)
+            if entry is not None:
+                with self._lock:
+                    self._insert(key, entry)
+
+        if entry is None or entry.negative or now - entry.expires_at > limit:
+            return None
+
+        with self._lock:
+            self._count(key, "stale_hits")
+        return entry.value, now - entry.stored_at
+
+    def set(self, key, value, ttl=None, negative=False):
+        """
+        Store a value, evicting least recently used entries when over budget
+        negative=True caches an error result (e.g. user not found) with the
+        short negative TTL
+        """
+        now = time.time()
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl_for(key)
+        size = _estimate_size(value)
+
+        entry = _Entry(value, now, now + ttl, size, negative)
+        with self._lock:
+            self._insert(key, entry)
+
+        if self.backing is not None:
+            if negative:
+                # Do not let an older positive row resurface from disk
+                self.backing.delete(key)
+            else:
+                self.backing.put(key, value, entry.stored_at, entry.expires_at)
+
+    def delete(self, key):
+        """Drop a key if present"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.backing is not None:
+            self.backing.delete(key)
+
+    def clear(self):
+        """Drop every entry, including the disk tier (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.backing is not None:
+            self.backing.clear()
+
+    def ttl_for(self, key):
+        """TTL for a key, based on its platform prefix"""
+        return self.ttls.get(key.split(":", 1)[0], self.default_ttl)
+
+    def stats(self):
+        """Hit/miss counters, per platform and in total"""
+        with self._lock:
+            platforms = {p: dict(c) for p, c in self._counters.items()}
+            hits = sum(c["hits"] + c["disk_hits"] for c in platforms.values())
+            misses = sum(c["misses"] for c in platforms.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": hits,
+                "disk_hits": sum(c["disk_hits"] for c in platforms.values()),
+                "stale_hits": sum(c["stale_hits"] for c in platforms.values()),
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "platforms": platforms,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, key, now, allow_stale=False):
+        """Read an entry from the disk tier (fresh only, unless allow_stale)"""
+        if self.backing is None:
+            return None
+        row = self.backing.get(key)
+        if row is None:
+            return None
+        value, stored_at, expires_at = row
+        if expires_at <= now and (not allow_stale or now - expires_at > self.max_stale):
+            return None
+        value = as_record(value)
+        return _Entry(value, stored_at, expires_at, _estimate_size(value))
+
+    def _insert(self, key, entry):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _count(self, key, field):
+        platform = key.split(":", 1)[0]
+        counters = self._counters.get(platform)
+        if counters is None:
+            counters = self._counters[platform] = {"hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0}
+        counters[field] += 1
+
+
+def _estimate_size(value):
+    """Rough memory footprint of a profile (container plus its items)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        for k, v in value.items():
+            size += sys.getsizeof(k) + sys.getsizeof(v)
+            if isinstance(v, (dict, list, tuple, set)):
+                size += sum(sys.getsizeof(x) for x in v)
+    return size
+
+
+def cache_key(platform, username, source=None):
+    """
+    Normalized cache key
+    source separates scrapers whose result dicts differ in shape
+    """
+    username = username.lstrip('@').strip().lower()
+    if source:
+        return f"{platform}:{source}:{username}"
+    return f"{platform}:{username}"
+
+
+def mark_stale(value, age):
+    """Copy of a stale cached profile, tagged with its age in seconds"""
+    marked = dict(value)
+    marked["is_stale"] = True
+    marked["cache_age_seconds"] = int(age)
+    return marked
+
+
+def _default_backing(max_stale):
+    """Disk tier from PROFILE_CACHE_DB (set it empty to keep the cache in memory only)"""
+    path = os.getenv("PROFILE_CACHE_DB", "./output/profile_cache.sqlite3")
+    if not path:
+        return None
+    try:
+        return DiskCache(path, retention=max_stale)
+    except Exception:
+        return None
+
+
+_max_stale = int(os.getenv("PROFILE_CACHE_MAX_STALE", str(DEFAULT_MAX_STALE)))
+
+# Process-wide cache shared by all scrapers
+profile_cache = ProfileCache(
+    max_entries=int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("PROFILE_CACHE_MAX_BYTES", "0")) or None,
+    backing=_default_backing(_max_stale),
+    max_stale=_max_stale,
+    negative_ttl=int(os.getenv("PROFILE_CACHE_NEGATIVE_TTL", str(DEFAULT_NEGATIVE_TTL))),
+)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Profile Record
+Compact slotted profile shared by every scraper. Counts are stored as
+ints and flags as bools; display strings ("1,234", "✅ Yes") are only
+produced by render_profile, at display time.
+"""
+
+import re
+import sys
+from collections.abc import Mapping, MutableMapping
+
+FIELDS = (
+    "platform", "account_id", "username", "full_name",
+    "followers", "following", "posts_count", "likes", "name_changes", "igtv_count",
+    "bio", "city", "country", "full_location", "bio_location",
+    "is_verified", "is_public", "is_business_account",
+    "external_url", "profile_pic", "profile_pic_url",
+    "linked_accounts", "contacts", "hashtags",
+    "avg_likes_per_post", "engagement_rate",
+    "search_timestamp",
+)
+COUNT_FIELDS = frozenset(("followers", "following", "posts_count", "likes", "name_changes", "igtv_count"))
+# Flag -> (label when True, label when False)
+FLAG_LABELS = {
+    "is_verified": ("✅ Yes", "❌ No"),
+    "is_public": ("🌐 Yes", "🔒 No"),
+    "is_business_account": ("✅ Yes", "❌ No"),
+}
+
+# Low-cardinality text fields: one shared string per distinct value
+INTERNED_FIELDS = frozenset(("platform", "city", "country", "full_location", "bio_location"))
+PLACEHOLDERS = frozenset(("N/A", "Not available", "Not set", "No bio set", ""))
+
+_FIELD_SET = frozenset(FIELDS)
+_SUFFIXES = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+_WORD = re.compile(r"[a-z]+")
+_TRUE_WORDS = frozenset(("yes", "true"))
+_FALSE_WORDS = frozenset(("no", "false"))
+
+
+def parse_count(value):
+    """int from 1234, "1,234" or "1.2M"; None when the value is not a count"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    text = str(value).replace(",", "").replace(" ", "").upper()
+    multiplier = _SUFFIXES.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    elif text.isdigit():
+        return int(text)
+    try:
+        return int(round(float(text) * multiplier))
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_flag(value):
+    """bool from True, 1 or labels like "✅ Yes" / "🔒 No"; None when unknown"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return bool(value)
+    if not isinstance(value, str):
+        return None
+    words = set(_WORD.findall(value.lower()))
+    if words & _TRUE_WORDS:
+        return True
+    if words & _FALSE_WORDS:
+        return False
+    return None
+
+
+class ProfileRecord(MutableMapping):
+    """
+    Profile as a slotted mapping (drop-in for the old result dicts)
+    Known fields live in slots, anything else in a small overflow dict.
+    Counts and flags are coerced on assignment; a value that cannot be
+    coerced (e.g. "Not available") leaves the field unset.
+    """
+
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, data=None, **fields):
+        self._extra = None
+        if data is not None:
+            self.update(data)
+        if fields:
+            self.update(fields)
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in COUNT_FIELDS:
+                value = parse_count(value)
+                if value is None:
+                    self._discard(key)
+                    return
+            elif key in FLAG_LABELS:
+                value = parse_flag(value)
+                if value is None:
+                    self._discard(key)
+                    return
+            elif type(value) is str and (key in INTERNED_FIELDS or value in PLACEHOLDERS):
+                value = sys.intern(value)
+            setattr(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._discard(key)
+
+    def __iter__(self):
+        for field in FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def _discard(self, key):
+        if key in _FIELD_SET:
+            if hasattr(self, key):
+                delattr(self, key)
+        elif self._extra is not None:
+            self._extra.pop(key, None)
+
+    def copy(self):
+        return ProfileRecord(self)
+
+    def to_dict(self):
+        """Plain dict (ints and bools as stored), for JSON and exports"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"ProfileRecord({self.to_dict()!r})"
+
+
+def as_record(value):
+    """ProfileRecord for a profile mapping; error dicts and non-mappings pass through"""
+    if isinstance(value, ProfileRecord) or not isinstance(value, Mapping) or "error" in value:
+        return value
+    return ProfileRecord(value)
+
+
+def render_count(value):
+    """1234 -> "1,234" (anything that is not a count is shown as is)"""
+    count = parse_count(value)
+    return f"{count:,}" if count is not None else value
+
+
+def render_profile(info):
+    """Display copy of a profile: counts with separators, flags as labels"""
+    shown = {}
+    for key, value in info.items():
+        if key in COUNT_FIELDS:
+            value = render_count(value)
+        elif key in FLAG_LABELS:
+            flag = parse_flag(value)
+            if flag is not None:
+                value = FLAG_LABELS[key][0 if flag else 1]
+        shown[key] = value
+    return shown
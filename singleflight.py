@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Request Coalescing (single-flight)
+Concurrent lookups of the same key share one upstream call and its outcome
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight blocking call"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """In-flight request table for blocking and asyncio callers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self._background = set()
+
+    def do(self, key, fn):
+        """
+        Run fn() once per key at a time
+        Callers arriving while it runs wait for it and get the same
+        return value, or the same exception raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key, fn):
+        """
+        Await fn() once per key at a time
+        The shared task is shielded, so a caller that is cancelled
+        (e.g. by asyncio.wait_for) does not cancel it for the others
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def do_background(self, key, fn):
+        """
+        Start do(key, fn) on a daemon thread and return immediately
+        Nothing is started if the key is already in flight; errors are dropped
+        """
+        with self._lock:
+            if key in self._calls:
+                return
+
+        def run():
+            try:
+                self.do(key, fn)
+            except Exception:
+                pass
+
+        threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
+
+    def do_background_async(self, key, fn):
+        """Schedule do_async(key, fn) on the running loop without awaiting it"""
+        task = self._tasks.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            return
+
+        async def run():
+            try:
+                await self.do_async(key, fn)
+            except Exception:
+                pass
+
+        # The table holds the shared task; keep this wrapper alive as well
+        runner = asyncio.get_running_loop().create_task(run())
+        self._background.add(runner)
+        runner.add_done_callback(self._background.discard)
+
+    def in_flight(self):
+        """Number of keys currently being fetched"""
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+
+# Process-wide table shared by all scrapers
+inflight = SingleFlight()
+
+
+def flight_key(platform, username):
+    """Normalized in-flight key for a platform lookup"""
+    return (platform, username.lstrip('@').strip().lower())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Spill Buffer
+Binary file object that stays in memory until it grows past a size
+threshold, then moves to a named temp file (unlike SpooledTemporaryFile,
+whose anonymous temp file cannot be handed to another process)
+"""
+
+import io
+import os
+import tempfile
+
+DEFAULT_MAX_SIZE = 16 * 1024 * 1024  # 16 MB
+
+
+class SpillBuffer(io.BufferedIOBase):
+    """
+    Seekable read/write buffer (usable by zipfile, gzip, TextIOWrapper...)
+    path is None while the data is in memory, else the temp file holding it
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, dir=None, suffix=""):
+        super().__init__()
+        self.max_size = max_size
+        self.dir = dir
+        self.suffix = suffix
+        self.path = None
+        self._file = io.BytesIO()
+
+    @property
+    def spilled(self):
+        return self.path is not None
+
+    def write(self, data):
+        written = self._file.write(data)
+        if self.path is None and self._file.tell() > self.max_size:
+            self._spill()
+        return written
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def read1(self, size=-1):
+        return self._file.read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def truncate(self, size=None):
+        return self._file.truncate(size)
+
+    def flush(self):
+        if not self.closed:
+            self._file.flush()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def getvalue(self):
+        """Contents as bytes (in-memory buffers only)"""
+        if self.path is not None:
+            raise ValueError("buffer spilled to disk, read it from self.path")
+        return self._file.getvalue()
+
+    def close(self):
+        """Close the buffer; a spilled temp file is kept for the reader (see path)"""
+        if not self.closed:
+            super().close()
+            self._file.close()
+
+    def discard(self):
+        """Close the buffer and delete any spilled temp file"""
+        self.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(dir=self.dir, prefix="export_", suffix=self.suffix)
+        spilled = os.fdopen(fd, "w+b")
+        position = self._file.tell()
+        spilled.write(self._file.getvalue())
+        spilled.seek(position)
+        self._file.close()
+        self._file = spilled
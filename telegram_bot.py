@@ -9,12 +9,20 @@ import time
 import re
 import asyncio
 import os
-from pathlib import Path
+from collections.abc import Mapping
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
-from telegram.constants import ChatAction
+from telegram.constants import ChatAction, MessageLimit
+from telegram.helpers import escape_markdown
 from instagram_rapidapi import InstagramRapidAPIScraper as InstagramInfoScraper
 from tiktok_rapidapi import TikTokRapidAPIScraper as TikTokScraper
+from http_session import close_async_client
+from history_store import get_history_store
+from export_service import get_export_service, ExportBusy
+from export_pipeline import available_formats
+from gazetteer import get_gazetteer, MIN_SCORE as GAZETTEER_MIN_SCORE
+from profile_record import render_profile, render_count
+from history_stats import compute_stats, account_age_bucket
 
 # Enable logging
 logging.basicConfig(
@@ -23,15 +31,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+HISTORY_PAGE_SIZE = 10  # Lookups per /history page
+FIND_PAGE_SIZE = 10  # Matches per /find page
+BIO_PAGE_SIZE = 10  # Matches per /bio page
+
 # ============ UTILITY FUNCTIONS ============
 
 def get_scraper(context):
     """Get user-isolated scraper instance"""
     if "scraper" not in context.user_data:
-        context.user_data["scraper"] = InstagramInfoScraper()
+        # History is kept per Telegram user in the history store, not the shared JSON file
+        context.user_data["scraper"] = InstagramInfoScraper(stale_while_revalidate=True, record_history=False)
     return context.user_data["scraper"]
 
 
+async def record_lookups(user_id, platform, infos):
+    """Save successful lookups to the caller's history (SQLite write + bio indexing, off the event loop)"""
+    def save():
+        store = get_history_store()
+        for info in infos:
+            if isinstance(info, Mapping) and "error" not in info:
+                try:
+                    store.add(user_id, platform, info)
+                except Exception:
+                    logger.exception("Failed to save search history")
+    
+    await asyncio.to_thread(save)
+
+
 def can_search(context, cooldown=5):
     """Rate limiting - prevent spam"""
     last = context.user_data.get("last_search", 0)
@@ -42,6 +69,30 @@ def can_search(context, cooldown=5):
     return True
 
 
+def page_keyboard(prefix, page, total, page_size):
+    """◀️ / ▶️ buttons for a paginated listing (callback data "<prefix>:<page>"), or None"""
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀️ Previous", callback_data=f"{prefix}:{page - 1}"))
+    if (page + 1) * page_size < total:
+        buttons.append(InlineKeyboardButton("Next ▶️", callback_data=f"{prefix}:{page + 1}"))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+def fit_message(text: str) -> str:
+    """Trim text to Telegram's message length limit"""
+    limit = MessageLimit.MAX_TEXT_LENGTH
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+async def send_or_edit(update, text, **kwargs) -> None:
+    """Edit the message behind a button press, or reply to a command"""
+    if hasattr(update, 'edit_message_text'):
+        await update.edit_message_text(text, **kwargs)
+    else:
+        await update.message.reply_text(text, **kwargs)
+
+
 def valid_username(username: str) -> bool:
     """Validate Instagram username format"""
     return bool(re.fullmatch(r"[a-zA-Z0-9._]{1,30}", username))
@@ -49,7 +100,8 @@ def valid_username(username: str) -> bool:
 
 def format_user_info(info: dict) -> str:
     """Format user info for display (DRY principle)"""
-    return f"""
+    info = render_profile(info)
+    text = f"""
 ✅ *@{info.get('username', 'N/A')}*
 
 👤 *Full Name:* {info.get('full_name', 'N/A')}
@@ -64,15 +116,23 @@ def format_user_info(info: dict) -> str:
 🔗 *URL:* {info.get('external_url', 'N/A')}
 🕐 *Search Time:* {info.get('search_timestamp', 'N/A')}
 """
+    if info.get("is_stale"):
+        minutes = info.get("cache_age_seconds", 0) // 60
+        text += f"♻️ _Cached {minutes} min ago, refreshing in background_\n"
+    return text
 
 
 def infer_account_origin(info: dict) -> dict:
     """Infer account origin from available data (estimation only)"""
     hints = []
     
-    bio = info.get("bio", "").lower()
-    if any(k in bio for k in ["ksa", "saudi", "egypt", "uae", "dubai", "middle east", "مصر", "السعودية"]):
-        hints.append("📌 Bio mentions location keyword")
+    gazetteer = get_gazetteer()
+    location = gazetteer.score(info.get("bio") or "")
+    for country, score in location["countries"][:2]:
+        if score < GAZETTEER_MIN_SCORE:
+            break
+        names = ", ".join(dict.fromkeys(e.name for e in location["matches"] if e.country == country))
+        hints.append(f"📌 Bio mentions {names} ({gazetteer.country_name(country)})")
     
     url = info.get("external_url")
     if url and "." in url:
@@ -95,25 +155,12 @@ def infer_account_origin(info: dict) -> dict:
 def estimate_account_age(posts_count, followers):
     """Estimate account age based on activity"""
     try:
-        posts = int(posts_count) if posts_count else 0
-        
-        if posts < 10:
-            return "Very New / Low Activity"
-        if posts < 50:
-            return "New (< 50 posts)"
-        if posts < 200:
-            return "Somewhat Established (50-200 posts)"
-        if posts < 500:
-            return "Established (200-500 posts)"
-        return "Very Active / Old (500+ posts)"
-    except:
+        return account_age_bucket(posts_count)
+    except TypeError:
         return "Unknown"
 
 # ============ END UTILITY FUNCTIONS ============
 
-# Initialize scraper
-scraper = InstagramInfoScraper()
-
 # User sessions
 user_sessions = {}
 
@@ -154,11 +201,24 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 📋 */history* - View all your searches
    • Shows usernames, names, followers
+   • 10 per page, use the ◀️ / ▶️ buttons
+
+🔎 */find* - Search your history by name (e.g. /find moh)
+   • Matches username / name prefixes
+   • Tolerates typos and Arabic spelling variants
 
-📥 */export* - Export search history
+📝 */bio* - Search your history's bios (e.g. /bio coffee AND riyadh)
+   • AND / OR / NOT, "exact phrases", #hashtags
+   • links:telegram finds linked accounts
+
+📥 */export* - Export search history (Excel; or /export csv.gz, ndjson, parquet)
    • Creates Excel file with all data
    • Download and share easily
 
+📈 */stats* - Analytics over your history (or /stats instagram, tiktok)
+   • Follower percentiles, engagement rates
+   • Verified / business ratios, account age
+
 🗑️ */clear* - Clear search history
    • Removes all saved searches
 
@@ -231,6 +291,26 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.answer()
         await show_history(query, user_id)
     
+    elif query.data.startswith('history:'):
+        await query.answer()
+        await show_history(query, user_id, page=int(query.data.split(':', 1)[1]))
+    
+    elif query.data.startswith('find:'):
+        await query.answer()
+        search = context.user_data.get('find_query')
+        if not search:
+            await query.edit_message_text("❌ Search expired. Use /find <name> again.")
+            return
+        await show_find(query, user_id, search, page=int(query.data.split(':', 1)[1]))
+    
+    elif query.data.startswith('bio:'):
+        await query.answer()
+        search = context.user_data.get('bio_query')
+        if not search:
+            await query.edit_message_text("❌ Search expired. Use /bio <query> again.")
+            return
+        await show_bio(query, user_id, search, page=int(query.data.split(':', 1)[1]))
+    
     elif query.data == 'export':
         await query.answer()
         await export_to_excel(query, user_id)
@@ -264,53 +344,161 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await show_history(update, user_id)
 
 
-async def show_history(update, user_id) -> None:
-    """Display search history"""
-    if scraper.search_history:
-        history_text = f"📋 *Search History* ({len(scraper.search_history)} users)\n\n"
-        
-        for i, (username, data) in enumerate(scraper.search_history.items(), 1):
-            full_name = data.get('full_name', 'N/A')
-            followers = data.get('followers', 'N/A')
-            timestamp = data.get('search_timestamp', 'N/A')
-            history_text += f"{i}. @{username}\n"
-            history_text += f"   👤 {full_name}\n"
-            history_text += f"   👥 {followers} followers\n"
-            history_text += f"   🕐 {timestamp}\n\n"
-        
-        if hasattr(update, 'edit_message_text'):
-            await update.edit_message_text(history_text, parse_mode='Markdown')
-        else:
-            await update.message.reply_text(history_text, parse_mode='Markdown')
-    else:
-        text = "❌ No search history found yet."
-        if hasattr(update, 'edit_message_text'):
-            await update.edit_message_text(text)
-        else:
-            await update.message.reply_text(text)
+async def show_history(update, user_id, page=0) -> None:
+    """Display one page of the caller's search history"""
+    store = get_history_store()
+    total = store.count(user_id)
+    if not total:
+        await send_or_edit(update, "❌ No search history found yet.")
+        return
+    
+    pages = -(-total // HISTORY_PAGE_SIZE)
+    page = min(max(page, 0), pages - 1)
+    offset = page * HISTORY_PAGE_SIZE
+    history = store.history(user_id, limit=HISTORY_PAGE_SIZE, offset=offset)
+    
+    history_text = f"📋 *Search History* ({total} users, page {page + 1}/{pages})\n\n"
+    for i, data in enumerate(history, offset + 1):
+        username = escape_markdown(str(data.get('username', 'N/A')))
+        full_name = escape_markdown(str(data.get('full_name', 'N/A')))
+        followers = render_count(data.get('followers', 'N/A'))
+        timestamp = data.get('search_timestamp', 'N/A')
+        history_text += f"{i}. @{username}\n"
+        history_text += f"   👤 {full_name}\n"
+        history_text += f"   👥 {followers} followers\n"
+        history_text += f"   🕐 {timestamp}\n\n"
+    
+    await send_or_edit(
+        update,
+        fit_message(history_text),
+        parse_mode='Markdown',
+        reply_markup=page_keyboard("history", page, total, HISTORY_PAGE_SIZE),
+    )
+
+
+async def find_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /find <name>: prefix and fuzzy search over the caller's history"""
+    search = " ".join(context.args).strip() if context.args else ""
+    if not search:
+        await update.message.reply_text("🔎 Usage: /find <username or name> (e.g. /find moh)")
+        return
+    context.user_data['find_query'] = search
+    await show_find(update, update.effective_user.id, search)
+
+
+async def show_find(update, user_id, search, page=0) -> None:
+    """Display one page of /find matches"""
+    def find_page(page):
+        # Building the index (first search) and fuzzy matching both scan the whole history
+        index = get_history_store().name_index(user_id)
+        return index.search(search, limit=FIND_PAGE_SIZE, offset=page * FIND_PAGE_SIZE)
+    
+    page = max(page, 0)
+    total, matches = await asyncio.to_thread(find_page, page)
+    if not total:
+        await send_or_edit(update, f"❌ No saved profiles match \"{search}\".")
+        return
+    
+    pages = -(-total // FIND_PAGE_SIZE)
+    if page >= pages:
+        # History shrank since the buttons were sent: show the last page
+        page = pages - 1
+        total, matches = await asyncio.to_thread(find_page, page)
+    text = f"🔎 *Matches for* \"{escape_markdown(search)}\" ({total}, page {page + 1}/{pages})\n\n"
+    for i, match in enumerate(matches, page * FIND_PAGE_SIZE + 1):
+        marker = "" if match["match"] == "prefix" else " ≈"
+        platform = str(match["platform"] or match["key"][0]).capitalize()
+        text += f"{i}. @{escape_markdown(match['username'])}{marker} ({platform})\n"
+        if match["full_name"]:
+            text += f"   👤 {escape_markdown(match['full_name'])}\n"
+        if match["followers"] is not None:
+            text += f"   👥 {render_count(match['followers'])} followers\n"
+        text += "\n"
+    
+    await send_or_edit(
+        update,
+        fit_message(text),
+        parse_mode='Markdown',
+        reply_markup=page_keyboard("find", page, total, FIND_PAGE_SIZE),
+    )
+
+
+async def bio_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /bio <query>: full-text search over the bios in the caller's history"""
+    search = " ".join(context.args).strip() if context.args else ""
+    if not search:
+        await update.message.reply_text("📝 Usage: /bio <query> (e.g. /bio coffee AND riyadh)")
+        return
+    context.user_data['bio_query'] = search
+    await show_bio(update, update.effective_user.id, search)
+
+
+async def show_bio(update, user_id, search, page=0) -> None:
+    """Display one page of /bio matches"""
+    store = get_history_store()
+    page = max(page, 0)
+    try:
+        # A user's first search indexes their older rows: keep it off the event loop
+        total, profiles = await asyncio.to_thread(
+            store.search_bios, user_id, search, BIO_PAGE_SIZE, page * BIO_PAGE_SIZE
+        )
+    except ValueError as e:
+        await send_or_edit(update, f"❌ {e}")
+        return
+    if not total:
+        await send_or_edit(update, f"❌ No saved bios match \"{search}\".")
+        return
+    
+    pages = -(-total // BIO_PAGE_SIZE)
+    if page >= pages:
+        # History shrank since the buttons were sent: show the last page
+        page = pages - 1
+        total, profiles = await asyncio.to_thread(
+            store.search_bios, user_id, search, BIO_PAGE_SIZE, page * BIO_PAGE_SIZE
+        )
+    text = f"📝 *Bios matching* \"{escape_markdown(search)}\" ({total}, page {page + 1}/{pages})\n\n"
+    for i, data in enumerate(profiles, page * BIO_PAGE_SIZE + 1):
+        platform = str(data['platform']).capitalize()
+        bio = " ".join(str(data.get('bio') or '').split())
+        if len(bio) > 120:
+            bio = bio[:119] + "…"
+        text += f"{i}. @{escape_markdown(str(data.get('username', 'N/A')))} ({platform})\n"
+        if bio:
+            text += f"   📝 {escape_markdown(bio)}\n"
+        text += "\n"
+    
+    await send_or_edit(
+        update,
+        fit_message(text),
+        parse_mode='Markdown',
+        reply_markup=page_keyboard("bio", page, total, BIO_PAGE_SIZE),
+    )
 
 
 async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /export command"""
+    """Handle /export [format] command (Excel by default)"""
     user_id = update.effective_user.id
-    await export_to_excel(update, user_id)
+    fmt = context.args[0].lower().lstrip('.') if context.args else "xlsx"
+    formats = ["xlsx"] + available_formats()
+    if fmt not in formats:
+        await update.message.reply_text(f"❌ Unknown format. Use: /export [{' | '.join(formats)}]")
+        return
+    await export_to_excel(update, user_id, fmt)
 
 
-async def export_to_excel(update, user_id) -> None:
-    """Export search history to Excel"""
-    scraper = get_scraper(update.callback_query.message._bot.get_chat(user_id) if hasattr(update, 'callback_query') else None)
+async def export_to_excel(update, user_id, fmt="xlsx") -> None:
+    """Export the caller's search history to Excel (or another export format)"""
+    # Button presses pass the CallbackQuery, commands pass the Update;
+    # both expose the originating message
+    message = update.message
+    chat = message.chat
     
-    # For button callback
-    if hasattr(update, 'callback_query'):
-        chat = update.callback_query.message.chat
-        message = update.callback_query.message
-    else:
-        chat = update.effective_chat
-        message = update.message
-    
-    # This is a bit tricky - we need context to get scraper
-    # Use the global scraper if available
-    if not scraper.search_history:
+    store = get_history_store()
+    version = store.version(user_id)
+    service = get_export_service()
+    artifact = service.cached(user_id, version, fmt)
+    total = artifact.row_count if artifact else store.count(user_id)
+    if not total:
         text = "❌ No searches to export. Search for some users first!"
         if hasattr(update, 'edit_message_text'):
             await update.edit_message_text(text)
@@ -319,35 +507,48 @@ async def export_to_excel(update, user_id) -> None:
         return
     
     try:
+        # Unchanged history since the last export: resend the uploaded file
+        if artifact and artifact.file_id:
+            await chat.send_document(
+                document=artifact.file_id,
+                caption=f"✅ Export file with {artifact.row_count} users"
+            )
+            return
+        
         # Show progress
         if hasattr(update, 'edit_message_text'):
-            await update.edit_message_text("⏳ Generating Excel file...")
+            await update.edit_message_text("⏳ Generating export file...")
         else:
-            await message.reply_text("⏳ Generating Excel file...")
+            await message.reply_text("⏳ Generating export file...")
         
-        # Generate Excel with unique filename
-        excel_path = scraper.export_search_history_to_excel()
+        # Build the file in the export pool, off the event loop
+        # (reused as-is while the history version is unchanged)
+        artifact = await service.export_history(user_id, version, total, fmt)
         
-        if excel_path and os.path.exists(excel_path):
+        if artifact and artifact.available:
             # Create unique filename
-            unique_filename = f"instagram_{user_id}_{int(time.time())}.xlsx"
+            unique_filename = f"instagram_{user_id}_{int(time.time())}.{fmt}"
             
-            # Send file
-            with open(excel_path, 'rb') as excel_file:
-                await chat.send_document(
-                    document=excel_file,
-                    caption=f"✅ Excel file with {len(scraper.search_history)} users",
-                    filename=unique_filename
-                )
-            
-            # Cleanup
+            # Stream the in-memory (or spilled) export straight to Telegram
             try:
-                os.remove(excel_path)
-            except:
-                pass
+                with artifact.open() as excel_file:
+                    sent = await chat.send_document(
+                        document=excel_file,
+                        caption=f"✅ Export file with {artifact.row_count} users",
+                        filename=unique_filename
+                    )
+            except BaseException:
+                # Not uploaded: free the content now rather than at the next export
+                service.discard(user_id, artifact)
+                raise
+            
+            # Telegram keeps the upload; later exports reuse its file_id
+            service.remember_upload(user_id, artifact, sent.document.file_id)
         else:
-            await message.reply_text("❌ Failed to create Excel file")
+            await message.reply_text("❌ Failed to create export file")
     
+    except ExportBusy as e:
+        await message.reply_text(str(e))
     except TimeoutError:
         await message.reply_text("⏱ Export timeout. Please try again.")
     except Exception as e:
@@ -355,10 +556,60 @@ async def export_to_excel(update, user_id) -> None:
         await message.reply_text("❌ Export failed. Please try again.")
 
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /stats [instagram|tiktok]: aggregates over the caller's history"""
+    user_id = update.effective_user.id
+    platform = context.args[0].lower() if context.args else None
+    if platform not in (None, "instagram", "tiktok"):
+        await update.message.reply_text("❌ Unknown platform. Use: /stats [instagram | tiktok]")
+        return
+    
+    # Building the columns reads the whole history and the aggregation scans
+    # every row: keep both off the event loop
+    def build_stats():
+        return compute_stats(get_history_store().columns(user_id), platform)
+    
+    stats = await asyncio.to_thread(build_stats)
+    if not stats["profiles"]:
+        await update.message.reply_text("❌ No searches to analyse. Search for some users first!")
+        return
+    await update.message.reply_text(format_stats(stats, platform), parse_mode='Markdown')
+
+
+def format_stats(stats: dict, platform=None) -> str:
+    """Format compute_stats output for Telegram"""
+    title = f" - {platform.title()}" if platform else ""
+    text = f"📈 *History Stats{title}* ({stats['profiles']} profiles)\n\n"
+    
+    followers = stats["followers"]
+    if followers["count"]:
+        text += "👥 *Followers*\n"
+        text += f"   median {render_count(round(followers['p50']))} · mean {render_count(round(followers['mean']))}\n"
+        text += "   " + " · ".join(
+            f"p{q} {render_count(round(followers[f'p{q}']))}" for q in (25, 75, 90, 99)
+        ) + "\n\n"
+    
+    engagement = stats["engagement"]
+    if engagement["count"]:
+        text += f"💬 *Engagement rate* ({engagement['count']} profiles)\n"
+        text += f"   median {engagement['p50']:.2f}% · p90 {engagement['p90']:.2f}%\n"
+        for label, count in stats["engagement_buckets"].items():
+            text += f"   {label}: {count}\n"
+        text += "\n"
+    
+    for label, key in (("✓ *Verified:*", "verified_ratio"), ("🏢 *Business:*", "business_ratio")):
+        ratio = stats[key]
+        text += f"{label} {ratio:.1%}\n" if ratio is not None else f"{label} N/A\n"
+    
+    text += "\n📅 *Account Age Estimate*\n"
+    for label, count in stats["account_age"].items():
+        text += f"   {label}: {count}\n"
+    return text
+
+
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Clear search history"""
-    scraper.search_history = {}
-    scraper.save_search_history()
+    """Clear the caller's search history"""
+    get_history_store().clear(update.effective_user.id)
     await update.message.reply_text("🗑️ Search history cleared!")
 
 
@@ -386,20 +637,21 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.chat.send_action(ChatAction.TYPING)
         
         if platform == 'tiktok':
-            tiktok_scraper = TikTokScraper()
-            info = tiktok_scraper.get_user_info(user_text)
+            tiktok_scraper = TikTokScraper(stale_while_revalidate=True)
+            info = await tiktok_scraper.get_user_info_async(user_text)
         else:
             scraper = get_scraper(context)
             try:
                 # Use timeout for Instagram to prevent slowdown (max 10 seconds)
                 info = await asyncio.wait_for(
-                    asyncio.to_thread(scraper.get_user_info, user_text),
+                    scraper.get_user_info_async(user_text),
                     timeout=10.0
                 )
             except asyncio.TimeoutError:
                 info = {"error": "⏱️ Instagram lookup timed out (took too long). Try again later or use TikTok."}
         
-        if isinstance(info, dict) and "error" not in info:
+        if isinstance(info, Mapping) and "error" not in info:
+            await record_lookups(user_id, platform, [info])
             response = format_user_info(info)
             
             if platform == 'instagram':
@@ -443,15 +695,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text(f"🔍 Searching {len(usernames)} users...")
         
         if platform == 'tiktok':
-            tiktok_scraper = TikTokScraper()
-            # Async batch search
+            tiktok_scraper = TikTokScraper(stale_while_revalidate=True)
+            # Async batch search (all lookups share one event loop)
             try:
                 tasks = [
-                    asyncio.to_thread(tiktok_scraper.get_user_info, u)
+                    tiktok_scraper.get_user_info_async(u)
                     for u in usernames
                 ]
                 results = await asyncio.gather(*tasks)
-                results = [r for r in results if isinstance(r, dict) and "error" not in r]
+                results = [r for r in results if isinstance(r, Mapping) and "error" not in r]
             except TimeoutError:
                 await update.message.reply_text("⏱ Search timeout. TikTok took too long to respond.")
                 context.user_data['mode'] = None
@@ -460,16 +712,18 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             scraper = get_scraper(context)
             try:
                 tasks = [
-                    asyncio.to_thread(scraper.get_user_info, u)
+                    scraper.get_user_info_async(u)
                     for u in usernames
                 ]
                 results = await asyncio.gather(*tasks)
-                results = [r for r in results if isinstance(r, dict)]
+                results = [r for r in results if isinstance(r, Mapping) and "error" not in r]
             except TimeoutError:
                 await update.message.reply_text("⏱ Search timeout. Instagram took too long to respond.")
                 context.user_data['mode'] = None
                 return
         
+        await record_lookups(user_id, platform, results)
+        
         # Summary
         summary = f"""
 ✅ *Batch Search Complete*
@@ -480,7 +734,7 @@ Users fetched:
         """
         
         for result in results:
-            summary += f"\n• @{result.get('username', 'N/A')} ({result.get('full_name', 'N/A')}) - {result.get('followers', 0)} followers"
+            summary += f"\n• @{result.get('username', 'N/A')} ({result.get('full_name', 'N/A')}) - {render_count(result.get('followers', 0))} followers"
         
         keyboard = [
             [InlineKeyboardButton("📥 Export to Excel", callback_data='export'),
@@ -514,20 +768,21 @@ Users fetched:
         await update.message.chat.send_action(ChatAction.TYPING)
         
         if platform == 'tiktok':
-            tiktok_scraper = TikTokScraper()
-            info = tiktok_scraper.get_user_info(user_text)
+            tiktok_scraper = TikTokScraper(stale_while_revalidate=True)
+            info = await tiktok_scraper.get_user_info_async(user_text)
         else:
             scraper = get_scraper(context)
             try:
                 # Use timeout for Instagram to prevent slowdown (max 10 seconds)
                 info = await asyncio.wait_for(
-                    asyncio.to_thread(scraper.get_user_info, user_text),
+                    scraper.get_user_info_async(user_text),
                     timeout=10.0
                 )
             except asyncio.TimeoutError:
                 info = {"error": "⏱️ Instagram lookup timed out (took too long). Try again later or use TikTok."}
         
-        if isinstance(info, dict) and "error" not in info:
+        if isinstance(info, Mapping) and "error" not in info:
+            await record_lookups(user_id, platform, [info])
             response = format_user_info(info)
             
             if platform == 'instagram':
@@ -570,10 +825,19 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         logger.exception("Failed to send error message")
 
 
+async def on_shutdown(application: Application) -> None:
+    """Release pooled HTTP connections and export workers when the bot stops"""
+    await close_async_client()
+    get_export_service().shutdown()
+
+
 def main() -> None:
     """Start the bot."""
+    # Build the location gazetteer now rather than on the first lookup
+    get_gazetteer()
+
     # Create the Application
-    application = Application.builder().token(os.getenv("TELEGRAM_TOKEN")).build()
+    application = Application.builder().token(os.getenv("TELEGRAM_TOKEN")).post_shutdown(on_shutdown).build()
 
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
@@ -582,6 +846,9 @@ def main() -> None:
     application.add_handler(CommandHandler("batch", batch_command))
     application.add_handler(CommandHandler("history", history_command))
     application.add_handler(CommandHandler("export", export_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("find", find_command))
+    application.add_handler(CommandHandler("bio", bio_command))
     application.add_handler(CommandHandler("clear", clear_command))
 
     # Add callback query handler for buttons
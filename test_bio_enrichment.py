@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the bio enrichment engine
+enrich_bio / enrich_bios must return exactly what TikTokScraper's original
+per-field re.search helpers (kept below as the oracle) returned, on
+hand-picked bios and on randomized ones built from the prefilter's edge
+cases (needles without a match, IGNORECASE-only letters, digit runs).
+"""
+
+import random
+import re
+
+import pytest
+
+from bio_enrichment import enrich_bio, enrich_bios, enrich_profiles
+
+
+def legacy_socials(bio):
+    socials = {}
+    if not bio:
+        return socials
+    patterns = {
+        'instagram': r'@([a-zA-Z0-9._]{1,30})|instagram\.com/([a-zA-Z0-9._]{1,30})',
+        'youtube': r'youtube\.com/@?([a-zA-Z0-9_-]+)',
+        'twitter': r'twitter\.com/([a-zA-Z0-9_]+)|x\.com/([a-zA-Z0-9_]+)',
+        'snapchat': r'snapchat[\s:]*([a-zA-Z0-9._-]+)',
+        'discord': r'discord(?:\.gg|\.com)?[/\s]*([a-zA-Z0-9]+)',
+        'telegram': r't\.me/([a-zA-Z0-9_]+)|telegram[/\s]*([a-zA-Z0-9_]+)'
+    }
+    for platform, pattern in patterns.items():
+        match = re.search(pattern, bio, re.IGNORECASE)
+        if match:
+            handle = match.group(1) or (match.group(2) if match.lastindex >= 2 else None)
+            if handle:
+                socials[platform] = handle
+    return socials
+
+
+def legacy_contacts(bio):
+    contacts = {}
+    if not bio:
+        return contacts
+    email_match = re.search(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', bio)
+    if email_match:
+        contacts['email'] = email_match.group(1)
+    phone_match = re.search(r'(\+?1?\s*[-.\(]?\d{3}[-.\)]?\s*\d{3}[-.]?\d{4}|\+\d{1,3}\s?\d{6,14})', bio)
+    if phone_match:
+        contacts['phone'] = phone_match.group(1)
+    return contacts
+
+
+def legacy_hashtags(bio, username=""):
+    text = (bio or "") + " " + (username or "")
+    return list(set(re.findall(r'#([a-zA-Z0-9_]+)', text)))
+
+
+def legacy_location(bio):
+    if not bio:
+        return None
+    for pattern in [r'📍\s*([^\n]+)', r'🌍\s*([^\n]+)', r'📌\s*([^\n]+)',
+                    r'Location:\s*([^\n,]+)', r'From:\s*([^\n,]+)']:
+        match = re.search(pattern, bio)
+        if match:
+            location = match.group(1).strip()
+            if location and len(location) > 1:
+                return location
+    return None
+
+
+def legacy_enrich(bio, username=""):
+    """The original TikTokScraper._enhance_info bio fields"""
+    result = {
+        "linked_accounts": legacy_socials(bio),
+        "contacts": legacy_contacts(bio),
+        "hashtags": legacy_hashtags(bio, username),
+    }
+    location = legacy_location(bio)
+    if location:
+        result["bio_location"] = location
+    return result
+
+
+def _same(result, expected):
+    """Equal, with hashtags compared as sets (both sides come from set())"""
+    return (
+        {k: v for k, v in result.items() if k != "hashtags"} == {k: v for k, v in expected.items() if k != "hashtags"}
+        and sorted(result["hashtags"]) == sorted(expected["hashtags"])
+    )
+
+
+BIOS = [
+    "",
+    "Coffee lover ☕ | Riyadh",
+    "📍 Dubai, UAE\nDM for collabs: hello@brand.co",
+    "IG @khaled.eats • YT youtube.com/@khaledeats • x.com/khaled_x",
+    "snapchat: sara.snap | discord.gg/abc123 | t.me/sara_tg",
+    "Telegram sara_tg — call +966 501234567 or (555) 123-4567",
+    "email me: name@mail",  # @ without a domain: an Instagram handle, no email
+    "INSTAGRAM.COM/Upper.Case  TWITTER.COM/Shout",
+    "İnstagram.com/dotted and Kelvin snapchatſ",  # IGNORECASE-only letters
+    "Location: Cairo, Egypt",
+    "From: Amman",
+    "📍 \nFrom: x",  # Empty 📍 line: falls through to From:
+    "#travel #food #travel",
+    "مصور في الرياض 📌 جدة #سفر #photo",
+    "discord",
+    "telegram",
+    "x.com/",
+    "12 345 678 9012",
+]
+
+
+@pytest.mark.parametrize("bio", BIOS)
+def test_enrich_matches_legacy(bio):
+    assert _same(enrich_bio(bio, "user#tag"), legacy_enrich(bio, "user#tag"))
+
+
+_FRAGMENTS = (
+    "@", "@a.b", "a@b.co", "x@y", ".com", "instagram.com/", "INSTAGRAM.COM/", "youtube.com/", "youtube.com/@",
+    "twitter.com/", "x.com/", "X.COM/", "snapchat", "snapchat:", "SnapChat ", "discord", "discord.gg/",
+    "discord.com ", "t.me/", "T.ME/", "telegram", "telegram/", "İ", "ı", "ſ", "K",
+    "#", "#tag", "📍", "🌍", "📌", "Location:", "location:", "From:", "from:", "\n", ",", " ", "-", ".",
+    "(", ")", "+", "+966", "1", "123", "4567", "555", "abc", "Sara_x", "مرحبا", "ké",
+)
+
+
+def _random_bio(rng):
+    return "".join(rng.choices(_FRAGMENTS, k=rng.randint(0, 14)))
+
+
+def test_enrich_matches_legacy_randomized():
+    rng = random.Random(18)
+    for _ in range(20000):
+        bio = _random_bio(rng)
+        username = rng.choice(("", "user", "#handle"))
+        assert _same(enrich_bio(bio, username), legacy_enrich(bio, username)), repr(bio)
+
+
+def test_enrich_bios_matches_legacy_randomized():
+    # Batches share one needle scan: a needle missing from the batch must
+    # never hide a match from any bio in it
+    rng = random.Random(1018)
+    for _ in range(2000):
+        bios = [_random_bio(rng) if rng.random() > 0.1 else None for _ in range(rng.randint(1, 12))]
+        usernames = [rng.choice(("", "#u")) for _ in bios]
+        for bio, username, result in zip(bios, usernames, enrich_bios(bios, usernames)):
+            assert _same(result, legacy_enrich(bio or "", username)), repr(bio)
+
+
+def test_enrich_profiles_in_place():
+    profiles = [{"username": "a", "bio": "t.me/a_tg #x"}, {"username": "b"}]
+    assert enrich_profiles(profiles) == profiles
+    assert profiles[0]["linked_accounts"] == {"telegram": "a_tg"}
+    assert profiles[0]["hashtags"] == ["x"]
+    assert profiles[1]["linked_accounts"] == {} and "bio_location" not in profiles[1]
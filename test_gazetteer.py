@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for the location gazetteer
+Rebuilding the automaton after add() must not duplicate matches.
+"""
+
+from gazetteer import Gazetteer, GazetteerEntry
+
+
+def _gazetteer():
+    return Gazetteer([
+        GazetteerEntry("Saudi Arabia", "SA", "country"),
+        GazetteerEntry("Riyadh", "SA", "city"),
+        GazetteerEntry("الرياض", "SA", "city"),
+        GazetteerEntry("Cairo", "EG", "city"),
+    ])
+
+
+def test_rebuild_is_idempotent():
+    bio = "Living in Riyadh, Saudi Arabia | من الرياض | from Cairo"
+    gazetteer = _gazetteer()
+    gazetteer.build()
+    expected = gazetteer.score(bio)["countries"]
+
+    gazetteer.add(GazetteerEntry("Jeddah", "SA", "city"))
+    gazetteer.build()
+    gazetteer.build()
+    assert gazetteer.score(bio)["countries"] == expected
+    assert len(gazetteer.find(bio)) == 4
+    assert gazetteer.score("Jeddah or Riyadh")["countries"] == [("SA", 1.6)]
+
+
+def test_rebuild_does_not_repeat_suffix_matches():
+    # "new york" is a state of "new yorker" whose failure link ends at "york"
+    gazetteer = Gazetteer([GazetteerEntry("York", "GB", "city"), GazetteerEntry("New Yorker", "US", "demonym")])
+    gazetteer.build()
+    gazetteer.add(GazetteerEntry("Leeds", "GB", "city"))
+    gazetteer.build()
+    assert [entry.name for _, _, entry in gazetteer.find("new york")] == ["York"]
+    assert [entry.name for _, _, entry in gazetteer.find("a new yorker in york")] == ["New Yorker", "York"]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the name search index
+Fuzzy matches must be similar to a whole term, not just share its first
+letters, and building from repeated keys must keep the latest profile.
+"""
+
+from name_index import NameIndex, _trigrams
+
+
+def _keys(index, query):
+    total, page = index.search(query, limit=1000)
+    assert total == len(page)
+    return {(match["key"], match["match"]) for match in page}
+
+
+def test_prefix_and_typo_match():
+    index = NameIndex([
+        ("a", {"username": "mohammed.ali", "full_name": "Mohammed Ali"}),
+        ("b", {"username": "sara_x", "full_name": "Sara"}),
+    ])
+    assert _keys(index, "moh") == {("a", "prefix")}
+    assert _keys(index, "mohamed") == {("a", "fuzzy")}
+    assert _keys(index, "sar") == {("b", "prefix")}
+
+
+def test_short_shared_prefix_is_not_a_fuzzy_match():
+    index = NameIndex(
+        [(f"user{i}", {"username": f"user{i}"}) for i in range(1000)]
+        + [("other", {"username": "username_taken", "full_name": "Unrelated Person"})]
+    )
+    keys = _keys(index, "user12")
+    assert ("user12", "prefix") in keys
+    assert ("user13", "fuzzy") in keys  # One character off
+    assert not any(key == "user987" for key, _ in keys)
+    assert not any(key == "other" for key, _ in keys)
+
+
+def test_unrelated_name_not_returned():
+    index = NameIndex([
+        ("a", {"username": "khaled", "full_name": "Khaled Omar"}),
+        ("b", {"username": "kate", "full_name": "Kate Smith"}),
+    ])
+    assert _keys(index, "khaleed") == {("a", "fuzzy")}
+    assert _keys(index, "khalil") == set()
+
+
+def test_every_query_word_must_match():
+    index = NameIndex([
+        ("a", {"username": "noura", "full_name": "Noura Saleh"}),
+        ("b", {"username": "noura2", "full_name": "Noura Hassan"}),
+    ])
+    assert _keys(index, "noura saleh") == {("a", "prefix")}
+    assert _keys(index, "noura zzz") == set()
+
+
+def test_repeated_key_while_building():
+    index = NameIndex([("a", {"username": "john"}), ("a", {"username": "mary"})])
+    assert len(index) == 1
+    assert _keys(index, "mary") == {("a", "prefix")}
+    assert _keys(index, "john") == set()
+
+
+def test_remove_and_reindex():
+    index = NameIndex([("a", {"username": "john"}), ("b", {"username": "johnny"})])
+    index.remove("a")
+    assert _keys(index, "john") == {("b", "prefix")}
+    index.append("b", {"username": "mary"})
+    assert _keys(index, "john") == set()
+    assert _keys(index, "mary") == {("b", "prefix")}
+    assert index._grams.keys() == {gram for term in index._terms for gram in _trigrams(term)}
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Tests for tiktok_html
+scan_profile_fields / TikTokScraper._parse_meta_tags must return exactly
+what the original seven-re.search implementation (kept below as the
+oracle) returned, on real-looking pages and on randomized script bodies.
+The streaming extractor must find both state script layouts whatever the
+chunking, and stop reading once it has.
+"""
+
+import random
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+from tiktok_html import (
+    STATE_SCRIPT_IDS, _OVERLAP, _PageResponse, _synthetic_page,
+    extract_user, find_state_script, read_profile_state, scan_profile_fields,
+)
+from tiktok_scraper import TikTokScraper
+
+
+def legacy_scan(text):
+    """The pre-scan_profile_fields body of _parse_meta_tags, for one script"""
+    meta_data = {}
+    try:
+        match = re.search(r'"uniqueId":"([^"]+)"', text)
+        if match:
+            meta_data['username'] = match.group(1)
+        match = re.search(r'"nickname":"([^"]+)"', text)
+        if match:
+            meta_data['full_name'] = match.group(1)
+        match = re.search(r'"followerCount":(\d+)', text)
+        if match:
+            meta_data['followers'] = int(match.group(1))
+        match = re.search(r'"followingCount":(\d+)', text)
+        if match:
+            meta_data['following'] = int(match.group(1))
+        match = re.search(r'"heartCount":(\d+)', text)
+        if match:
+            meta_data['likes'] = int(match.group(1))
+        match = re.search(r'"videoCount":(\d+)', text)
+        if match:
+            meta_data['posts'] = int(match.group(1))
+        match = re.search(r'"verified":([^,}]+)', text)
+        if match:
+            meta_data['verified'] = match.group(1).lower() == 'true'
+    except:
+        pass
+    return meta_data
+
+
+def legacy_parse_meta_tags(soup):
+    """The original _parse_meta_tags (later scripts override earlier ones)"""
+    meta_data = {}
+    for script in soup.find_all("script"):
+        if script.string and '"uniqueId"' in script.string:
+            meta_data.update(legacy_scan(script.string))
+    return meta_data
+
+
+FULL_USER = (
+    '{"user":{"id":"6800","uniqueId":"khaled.eats","nickname":"خالد | Food 🍔",'
+    '"verified":true,"privateAccount":false},'
+    '"stats":{"followerCount":1523000,"followingCount":311,"heartCount":98000000,"videoCount":842}}'
+)
+
+SCRIPTS = {
+    "full": FULL_USER,
+    "stats_first": (
+        '{"stats":{"videoCount":12,"heartCount":40,"followingCount":2,"followerCount":9},'
+        '"user":{"verified":false,"nickname":"Sara","uniqueId":"sara_x"}}'
+    ),
+    "missing_stats": '{"user":{"uniqueId":"no.stats","nickname":"No Stats"}}',
+    "missing_nickname": '{"user":{"uniqueId":"anon","verified":false},"stats":{"followerCount":0}}',
+    "empty_nickname": '{"user":{"uniqueId":"blank","nickname":"","verified":false}}',
+    "string_counts": '{"user":{"uniqueId":"str"},"stats":{"followerCount":"1.2M","videoCount":"7"}}',
+    "verified_last": '{"user":{"uniqueId":"last","nickname":"Last","verified":true}}',
+    "verified_unterminated": '"verified":true "uniqueId":"runon" "followerCount":5',
+    "repeated_fields": (
+        '{"uniqueId":"first","followerCount":1},{"uniqueId":"second","followerCount":2,"verified":True}'
+    ),
+    "whitespace_values": '{"uniqueId":"spaced","verified": true ,"followerCount": 10}',
+    "escaped_quote": r'{"uniqueId":"q","nickname":"say \"hi\"","heartCount":3}',
+    "no_fields": '{"uniqueIdx":"nope","nick":"n"}',
+}
+
+
+@pytest.mark.parametrize("name", sorted(SCRIPTS))
+def test_scan_matches_legacy(name):
+    text = SCRIPTS[name]
+    assert scan_profile_fields(text) == legacy_scan(text)
+
+
+def _page(*scripts, attrs='type="application/json"'):
+    body = "".join(f"<script {attrs}>{script}</script>" for script in scripts)
+    return (
+        '<html><head><meta property="og:title" content="TikTok">'
+        f"<script>window.__init = 1;</script></head><body>{body}</body></html>"
+    )
+
+
+PAGES = {
+    "single": _page(FULL_USER),
+    "attrs_id_first": _page(FULL_USER, attrs='id="user-data" type="application/json"'),
+    "attrs_type_first": _page(FULL_USER, attrs='type="application/json" id="user-data" nonce="abc"'),
+    "attrs_none": _page(FULL_USER, attrs=""),
+    "later_script_overrides": _page(SCRIPTS["full"], SCRIPTS["stats_first"]),
+    "partial_then_full": _page(SCRIPTS["missing_stats"], SCRIPTS["full"]),
+    "full_then_partial": _page(SCRIPTS["full"], SCRIPTS["missing_nickname"]),
+    "no_user_script": _page('{"appId":1233}'),
+    "no_scripts": "<html><body><p>uniqueId</p></body></html>",
+}
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_parse_meta_tags_matches_legacy(name):
+    soup = BeautifulSoup(PAGES[name], "html.parser")
+    assert TikTokScraper._parse_meta_tags(None, soup) == legacy_parse_meta_tags(soup)
+
+
+_FRAGMENTS = (
+    '"uniqueId":"a"', '"uniqueId":""', '"nickname":"N x"', '"nickname":"',
+    '"followerCount":12', '"followerCount":"12"', '"followingCount":3', '"heartCount":99',
+    '"videoCount":7', '"verified":true', '"verified":false', '"verified":TRUE ',
+    '"verified":1', '"verified":', ',', '}', '{', ' ', '"', 'x',
+)
+
+
+def test_scan_matches_legacy_randomized():
+    rng = random.Random(17)
+    for _ in range(20000):
+        text = "".join(rng.choices(_FRAGMENTS, k=rng.randint(1, 12)))
+        assert scan_profile_fields(text) == legacy_scan(text), text
+
+
+# ---- streaming state-script extraction ----
+
+STATE = '{"UserModule":{"users":{"u":{"uniqueId":"u","nickname":"يو ✓"}},"stats":{"u":{"followerCount":5}}}}'
+OPEN_TAG = '<script id="SIGI_STATE" type="application/json">'
+
+
+def _state_page(prefix_len=2000, suffix_len=2000):
+    return "x" * prefix_len + OPEN_TAG + STATE + "</script>" + "y" * suffix_len
+
+
+def _chunked(text, *sizes):
+    """text cut at the given chunk sizes, the rest in one chunk"""
+    chunks, start = [], 0
+    for size in sizes:
+        chunks.append(text[start:start + size])
+        start += size
+    return chunks + [text[start:]]
+
+
+def test_close_tag_split_across_chunks():
+    page = _state_page()
+    close = page.index("</script>")
+    for cut in range(close - 2, close + len("</script>") + 1):
+        script_id, payload, _ = find_state_script(iter(_chunked(page, cut)))
+        assert (script_id, payload) == ("SIGI_STATE", STATE), cut
+
+
+def test_close_tag_spread_over_tiny_chunks():
+    page = _state_page()
+    for size in (1, 2, 3, 5, 8):
+        chunks = [page[i:i + size] for i in range(0, len(page), size)]
+        assert find_state_script(iter(chunks))[:2] == ("SIGI_STATE", STATE), size
+
+
+def test_open_tag_split_across_overlap():
+    # The first chunk ends inside the open tag, at every offset, with more
+    # than the 512-character overlap of filler before it
+    page = _state_page(prefix_len=3 * _OVERLAP)
+    tag = page.index(OPEN_TAG)
+    for cut in range(tag - 1, tag + len(OPEN_TAG) + 1):
+        for rest in (7, 64, 600):
+            chunks = _chunked(page, cut, *[rest] * (len(page) // rest))
+            assert find_state_script(iter(chunks))[:2] == ("SIGI_STATE", STATE), (cut, rest)
+
+
+def test_open_tag_straddling_where_overlap_starts():
+    # Tag starts just inside / just outside the tail kept from the first chunk
+    for before_end in (_OVERLAP - len(OPEN_TAG), _OVERLAP - 1, len(OPEN_TAG) // 2):
+        page = _state_page(prefix_len=5000)
+        cut = page.index(OPEN_TAG) + before_end
+        chunks = _chunked(page, cut - _OVERLAP, _OVERLAP)
+        assert find_state_script(iter(chunks))[:2] == ("SIGI_STATE", STATE), before_end
+
+
+def test_find_state_script_stops_reading():
+    page = _state_page()
+    consumed = []
+
+    def chunks():
+        for chunk in _chunked(page, 1000, 1000, 1000, 1000):
+            consumed.append(chunk)
+            yield chunk
+
+    source = chunks()
+    _, _, seen = find_state_script(source)
+    assert seen == consumed
+    assert page.index("</script>") < len("".join(consumed)) < len(page)
+    assert "".join(consumed) + "".join(source) == page  # The rest is left unread
+
+
+def test_no_state_script():
+    page = "<html><script>var a = 1;</script>" + "z" * 5000 + "</html>"
+    script_id, payload, seen = find_state_script(iter(_chunked(page, 100, 100)))
+    assert (script_id, payload, "".join(seen)) == (None, None, page)
+    assert find_state_script(iter([page]), keep_page=False) == (None, None, None)
+
+
+@pytest.mark.parametrize("script_id", STATE_SCRIPT_IDS)
+def test_read_profile_state_layouts(script_id):
+    response = _PageResponse(_synthetic_page(script_id))
+    user, stats, page = read_profile_state(response, chunk_size=4096)
+    assert (user["uniqueId"], stats["followerCount"], page) == ("synthetic.user", 1523000, None)
+    assert response.closed
+    assert response.bytes_read < len(response.content) // 2
+
+
+def test_read_profile_state_fallback_keeps_page():
+    content = _synthetic_page(None)
+    response = _PageResponse(content)
+    assert read_profile_state(response, chunk_size=1000) == (None, None, content.decode("utf-8"))
+    assert response.closed
+
+
+def test_read_profile_state_without_page():
+    response = _PageResponse(_synthetic_page(None))
+    assert read_profile_state(response, keep_page=False) == (None, None, None)
+    assert response.closed
+
+    response = _PageResponse(_synthetic_page("SIGI_STATE"))
+    user, _, page = read_profile_state(response, keep_page=False)
+    assert user["uniqueId"] == "synthetic.user" and page is None
+    assert response.bytes_read < len(response.content) // 2
+
+
+def test_read_profile_state_multibyte_split():
+    content = ("<html>" + OPEN_TAG + STATE + "</script></html>").encode("utf-8")
+    user, stats, _ = read_profile_state(_PageResponse(content), chunk_size=1)
+    assert (user["nickname"], stats["followerCount"]) == ("يو ✓", 5)
+
+
+def test_rehydration_without_user_falls_back():
+    payload = '{"__DEFAULT_SCOPE__":{"webapp.user-detail":{"userInfo":{}}}}'
+    content = f'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__">{payload}</script>'.encode("utf-8")
+    assert extract_user("__UNIVERSAL_DATA_FOR_REHYDRATION__", payload) is None
+    assert read_profile_state(_PageResponse(content)) == (None, None, content.decode("utf-8"))
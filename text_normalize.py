@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Text Normalization
+Shared folding for matching names and bios written in English or Arabic:
+case, accents, Arabic diacritics and Arabic letter variants
+"""
+
+import unicodedata
+
+_ARABIC_FOLD = str.maketrans({
+    "ة": "ه",
+    "ى": "ي",
+    "ؤ": "و",
+    "ئ": "ي",
+    "ٱ": "ا",
+    "ـ": None,  # Tatweel
+})
+
+
+def normalize(text):
+    """
+    Lowercase, strip accents / Arabic diacritics and fold Arabic letter
+    variants (أ إ آ -> ا, ة -> ه, ى -> ي) so spellings compare equal
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text.translate(_ARABIC_FOLD)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+TikTok Profile Page Extractor
+Streams the profile page and stops reading as soon as the embedded
+SIGI_STATE / __UNIVERSAL_DATA_FOR_REHYDRATION__ JSON has been received,
+instead of building a BeautifulSoup tree of the whole page
+"""
+
+import codecs
+import re
+
+import json_codec
+
+STATE_SCRIPT_IDS = ("SIGI_STATE", "__UNIVERSAL_DATA_FOR_REHYDRATION__")
+
+_OPEN_TAG = re.compile(r'<script\b[^>]*\bid="(SIGI_STATE|__UNIVERSAL_DATA_FOR_REHYDRATION__)"[^>]*>')
+_CLOSE_TAG = "</script"
+_OVERLAP = 512  # Kept between chunks so a tag split across them is still found
+
+CHUNK_SIZE = 16 * 1024
+
+# Profile fields picked out of inline scripts when there is no state JSON:
+# key -> (result name, value pattern, converter). Each key is located by
+# one scan for all keys and its value matched in place, so a field's first
+# match is exactly what re.search for the whole pattern would find.
+_PROFILE_FIELDS = {
+    "uniqueId": ("username", re.compile(r'"uniqueId":"([^"]+)"'), str),
+    "nickname": ("full_name", re.compile(r'"nickname":"([^"]+)"'), str),
+    "followerCount": ("followers", re.compile(r'"followerCount":(\d+)'), int),
+    "followingCount": ("following", re.compile(r'"followingCount":(\d+)'), int),
+    "heartCount": ("likes", re.compile(r'"heartCount":(\d+)'), int),
+    "videoCount": ("posts", re.compile(r'"videoCount":(\d+)'), int),
+    "verified": ("verified", re.compile(r'"verified":([^,}]+)'), lambda value: value.lower() == 'true'),
+}
+# Keys only: a hit never runs into the next field, so every occurrence of every key is seen
+_PROFILE_KEYS = re.compile('"(' + "|".join(_PROFILE_FIELDS) + ')":')
+
+
+def iter_text(response, chunk_size=CHUNK_SIZE):
+    """Decoded text chunks of a streamed requests response"""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def find_state_script(chunks, keep_page=True):
+    """
+    Scan text chunks for the first state script
+    Returns (script_id, payload_text, seen) as soon as its closing tag
+    arrives, without consuming the remaining chunks; script_id is None
+    when the page has none. seen lists the chunks consumed so far (None
+    when keep_page is False), for fallback parsing of the page.
+    """
+    seen = [] if keep_page else None
+    tail = ""
+    payload = None
+
+    for chunk in chunks:
+        if seen is not None:
+            seen.append(chunk)
+
+        if payload is None:
+            window = tail + chunk
+            match = _OPEN_TAG.search(window)
+            if match is None:
+                tail = window[-_OVERLAP:]
+                continue
+            script_id = match.group(1)
+            payload = []
+            carry = ""
+            rest = window[match.end():]
+        else:
+            rest = chunk
+
+        # carry: end of the payload so far, in case the closing tag is split
+        end = (carry + rest).find(_CLOSE_TAG)
+        if end >= 0:
+            text = "".join(payload) + rest
+            return script_id, text[:len(text) - len(rest) - len(carry) + end], seen
+
+        payload.append(rest)
+        carry = (carry + rest)[-(len(_CLOSE_TAG) - 1):]
+
+    return None, None, seen
+
+
+def extract_user(script_id, payload):
+    """
+    (user, stats) dicts from a state script payload, or None
+    SIGI_STATE keeps them under UserModule; the newer rehydration blob
+    under __DEFAULT_SCOPE__["webapp.user-detail"].userInfo
+    """
+    data = json_codec.loads(payload)
+    if script_id == "SIGI_STATE":
+        users = data.get("UserModule", {}).get("users", {})
+        stats = data.get("UserModule", {}).get("stats", {})
+        if not users:
+            return None
+        return list(users.values())[0], list(stats.values())[0] if stats else {}
+
+    info = data.get("__DEFAULT_SCOPE__", {}).get("webapp.user-detail", {}).get("userInfo", {})
+    if not info.get("user"):
+        return None
+    return info["user"], info.get("stats") or {}
+
+
+def read_profile_state(response, chunk_size=CHUNK_SIZE, keep_page=True):
+    """
+    Stream a profile page response (requested with stream=True)
+    Returns (user, stats, None) when the state script was found and
+    decoded, else (None, None, page_text) for fallback parsing. Only in
+    that fallback case is the rest of the page read; with keep_page=False
+    (callers without a fallback) nothing is buffered or read past the
+    state script and page_text is None. The response is closed either way.
+    """
+    try:
+        chunks = iter_text(response, chunk_size)
+        script_id, payload, seen = find_state_script(chunks, keep_page)
+        if script_id is not None:
+            try:
+                found = extract_user(script_id, payload)
+            except (ValueError, AttributeError):
+                found = None
+            if found:
+                return found[0], found[1], None
+        if not keep_page:
+            return None, None, None
+        seen.extend(chunks)
+        return None, None, "".join(seen)
+    finally:
+        response.close()
+
+
+def scan_profile_fields(text):
+    """
+    Profile fields from a script body, in one pass
+    Each key occurrence is tried against its field's pattern, and the first
+    that matches wins, which is what a separate re.search per field finds
+    """
+    found = {}
+    for key in _PROFILE_KEYS.finditer(text):
+        name, pattern, convert = _PROFILE_FIELDS[key.group(1)]
+        if name in found:
+            continue
+        match = pattern.match(text, key.start())
+        if match:
+            found[name] = convert(match.group(1))
+            if len(found) == len(_PROFILE_FIELDS):
+                break
+    return found
+
+
+class _PageResponse:
+    """Stand-in for a streamed requests response over in-memory bytes (benchmark and tests)"""
+
+    encoding = "utf-8"
+
+    def __init__(self, content):
+        self.content = content
+        self.bytes_read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            chunk = self.content[start:start + chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def _synthetic_page(script_id="SIGI_STATE"):
+    """
+    A ~300 KB profile page with the user in a script_id state script,
+    or (script_id None) only in a plain inline script, as on pages the
+    fallback has to parse
+    """
+    user = {
+        "id": "6800000000", "uniqueId": "synthetic.user", "nickname": "Synthetic User ✓",
+        "signature": "Coffee ☕ | Riyadh 📍 " * 5, "verified": True, "privateAccount": False,
+    }
+    stats = {"followerCount": 1523000, "followingCount": 311, "heartCount": 98000000, "videoCount": 842}
+    items = {str(i): {"desc": "video " * 20, "stats": stats} for i in range(100)}
+    if script_id == "SIGI_STATE":
+        state = {"UserModule": {"users": {"synthetic.user": user}, "stats": {"synthetic.user": stats}},
+                 "ItemModule": items}
+    else:
+        state = {"__DEFAULT_SCOPE__": {"webapp.user-detail": {"userInfo": {"user": user, "stats": stats}},
+                                       "webapp.video-list": items}}
+    attrs = f'id="{script_id}" type="application/json"' if script_id else 'type="application/json"'
+    head = "".join(f'<link rel="preload" href="/static/chunk-{i}.js" as="script">' for i in range(400))
+    body = "".join(f'<div class="video-card" data-index="{i}"><span>{"x" * 200}</span></div>' for i in range(1000))
+    return (
+        f"<!DOCTYPE html><html><head>{head}"
+        f"<script {attrs}>{json_codec.dumps(state)}</script>"
+        f"</head><body>{body}</body></html>"
+    ).encode("utf-8")
+
+
+def _soup_fields(soup):
+    """The scrapers' fallback: profile fields from every inline script of a parsed page"""
+    fields = {}
+    for script in soup.find_all("script"):
+        if script.string and '"uniqueId"' in script.string:
+            fields.update(scan_profile_fields(script.string))
+    return fields
+
+
+def _benchmark(paths=(), rounds=50):
+    """
+    Compare the streaming extractor with the old full BeautifulSoup parse
+    Runs on the saved profile pages given (e.g. python tiktok_html.py
+    page.html), else on synthetic SIGI_STATE, rehydration and
+    no-state-script pages
+    """
+    import time
+    import tracemalloc
+    from pathlib import Path
+
+    from bs4 import BeautifulSoup
+
+    if paths:
+        pages = [(Path(path).name, Path(path).read_bytes()) for path in paths]
+    else:
+        pages = [(script_id or "no state script", _synthetic_page(script_id))
+                 for script_id in (*STATE_SCRIPT_IDS, None)]
+
+    def old_path(page):
+        response = _PageResponse(page)
+        text = b"".join(response.iter_content(CHUNK_SIZE)).decode(response.encoding)
+        soup = BeautifulSoup(text, "html.parser")
+        for script_id in STATE_SCRIPT_IDS:
+            script = soup.find("script", id=script_id)
+            if script and script.string:
+                found = extract_user(script_id, str(script.string))
+                if found:
+                    return response, found
+        return response, _soup_fields(soup)
+
+    def streaming(page, keep_page):
+        response = _PageResponse(page)
+        user, stats, text = read_profile_state(response, keep_page=keep_page)
+        if text is not None:
+            return response, _soup_fields(BeautifulSoup(text, "html.parser"))
+        return response, (user, stats)
+
+    cases = [
+        ("BeautifulSoup (old)", old_path),
+        ("streaming", lambda page: streaming(page, True)),
+        ("streaming, keep_page=False", lambda page: streaming(page, False)),
+    ]
+    for name, page in pages:
+        print(f"{name}: {len(page) // 1024} KB, {rounds} rounds")
+        for label, fn in cases:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                fn(page)
+            elapsed = (time.perf_counter() - start) / rounds * 1e3
+
+            tracemalloc.start()
+            response, _ = fn(page)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<28} {elapsed:8.2f} ms  peak {peak / 1024:8.0f} KB  read {response.bytes_read // 1024} KB")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(sys.argv[1:])
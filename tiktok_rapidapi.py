@@ -4,20 +4,29 @@ TikTok RapidAPI Scraper - Optimized Version
 Fast and reliable TikTok user data extraction
 """
 
+import httpx
 import requests
-import json
 import os
-import time
 from datetime import datetime
+from pathlib import Path
+from http_session import get_session, get_async_client
+from singleflight import inflight, flight_key
+from backoff import backoff
+from profile_cache import profile_cache, cache_key, mark_stale
+from excel_export import write_excel_streaming
+from json_codec import decode_response, TikTokPayload, TikTokStats
+from profile_record import ProfileRecord
 
 class TikTokRapidAPIScraper:
     """TikTok scraper using RapidAPI"""
     
-    def __init__(self):
+    def __init__(self, stale_while_revalidate=False):
         self.rapidapi_key = os.getenv("RAPIDAPI_KEY", "")
         self.rapidapi_host = "tiktok-api23.p.rapidapi.com"
-        self._cache = {}
-        self._cache_ttl = 86400  # 24 hours
+        self.api_url = "https://tiktok-api23.p.rapidapi.com/api/user/info"
+        self._cache = profile_cache
+        # Serve expired cache entries instantly and refresh them in the background
+        self.stale_while_revalidate = stale_while_revalidate
     
     def get_user_info(self, username, timeout=12):
         """Get TikTok user info via RapidAPI"""
@@ -25,87 +34,149 @@ class TikTokRapidAPIScraper:
             username = username.lstrip('@')
             
             # Check cache
-            cached = self._cache_get(f"tiktok:{username}")
+            cached = self._cache.get(cache_key("tiktok", username))
             if cached:
                 return cached
             
             if not self.rapidapi_key:
                 return {"error": "❌ RAPIDAPI_KEY not configured"}
             
-            # RapidAPI TikTok endpoint
-            url = "https://tiktok-api23.p.rapidapi.com/api/user/info"
-            headers = {
-                "x-rapidapi-host": self.rapidapi_host,
-                "x-rapidapi-key": self.rapidapi_key,
-                "accept": "application/json"
-            }
-            params = {"uniqueId": username}
+            if self.stale_while_revalidate:
+                stale = self._get_stale(username)
+                if stale:
+                    inflight.do_background(flight_key("tiktok", username), lambda: self._fetch(username, timeout))
+                    return stale
             
-            response = requests.get(url, headers=headers, params=params, timeout=timeout)
+            # RapidAPI TikTok endpoint (shared with concurrent lookups of the same user)
+            return inflight.do(flight_key("tiktok", username), lambda: self._fetch(username, timeout))
+        
+        except requests.Timeout:
+            return None  # Fallback
+        except:
+            return None  # Fallback
+    
+    async def get_user_info_async(self, username, timeout=12):
+        """Non-blocking version of get_user_info for the asyncio bot"""
+        try:
+            username = username.lstrip('@')
             
-            if response.status_code == 200:
-                data = response.json()
-                info = self._parse_response(data)
-                
-                if info and "error" not in info:
-                    self._cache_set(f"tiktok:{username}", info)
-                    return info
+            cached = self._cache.get(cache_key("tiktok", username))
+            if cached:
+                return cached
             
-            if response.status_code == 404:
-                return {"error": "❌ TikTok user not found"}
+            if not self.rapidapi_key:
+                return {"error": "❌ RAPIDAPI_KEY not configured"}
             
-            if response.status_code == 429:
-                return {"error": "⏱️ RapidAPI rate limit. Try again later."}
+            if self.stale_while_revalidate:
+                stale = self._get_stale(username)
+                if stale:
+                    inflight.do_background_async(flight_key("tiktok", username), lambda: self._fetch_async(username, timeout))
+                    return stale
             
-            return None  # Fallback to web scrape
+            return await inflight.do_async(flight_key("tiktok", username), lambda: self._fetch_async(username, timeout))
         
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return None  # Fallback
         except:
             return None  # Fallback
     
-    def _parse_response(self, data):
-        """Parse RapidAPI TikTok response"""
+    def export_to_excel(self, profiles, filename="tiktok_search_results.xlsx"):
+        """Stream TikTok profiles (any iterable of dicts) to a formatted Excel file"""
+        output_dir = Path("./output")
+        output_dir.mkdir(exist_ok=True)
+        return write_excel_streaming(profiles, output_dir / filename, sheet_title="TikTok Users")
+    
+    def _get_stale(self, username):
+        """Expired (but not too old) cached profile, marked with its age"""
+        hit = self._cache.get_stale(cache_key("tiktok", username))
+        if hit is None:
+            return None
+        return mark_stale(*hit)
+    
+    def _fetch(self, username, timeout):
+        """Call RapidAPI and handle the response"""
+        if backoff.remaining("tiktok"):
+            return self._rate_limited()
+        response = get_session().get(self.api_url, headers=self._headers(), params=self._params(username), timeout=timeout)
+        return self._handle_response(response, username)
+    
+    async def _fetch_async(self, username, timeout):
+        """Call RapidAPI on the async client and handle the response"""
+        if backoff.remaining("tiktok"):
+            return self._rate_limited()
+        response = await get_async_client().get(self.api_url, headers=self._headers(), params=self._params(username), timeout=timeout)
+        return self._handle_response(response, username)
+    
+    def _rate_limited(self):
+        """Error for lookups made inside the platform's backoff window"""
+        wait = int(backoff.remaining("tiktok")) + 1
+        return {"error": f"⏱️ RapidAPI rate limit. Try again in {wait}s."}
+    
+    def _headers(self):
+        """RapidAPI request headers"""
+        return {
+            "x-rapidapi-host": self.rapidapi_host,
+            "x-rapidapi-key": self.rapidapi_key,
+            "accept": "application/json"
+        }
+    
+    def _params(self, username):
+        """RapidAPI query parameters"""
+        return {"uniqueId": username}
+    
+    def _handle_response(self, response, username):
+        """Turn a RapidAPI response (requests or httpx) into user info, an error or None"""
+        if response.status_code == 200:
+            payload = decode_response(response, TikTokPayload)
+            info = self._parse_response(payload)
+            
+            if info and "error" not in info:
+                self._cache.set(cache_key("tiktok", username), info)
+                return info
+        
+        if response.status_code == 404:
+            # Remember misses briefly so typos and repeats skip the API
+            error = {"error": "❌ TikTok user not found"}
+            self._cache.set(cache_key("tiktok", username), error, negative=True)
+            return error
+        
+        if response.status_code == 429:
+            # Back off the whole platform instead of letting every lookup fail upstream
+            backoff.trip("tiktok", response.headers.get("Retry-After"))
+            return self._rate_limited()
+        
+        return None  # Fallback to web scrape
+    
+    def _parse_response(self, payload):
+        """Parse a decoded TikTokPayload"""
         try:
-            if not data:
+            if not payload:
                 return None
             
             # Handle different response structures
-            user_data = data.get("data") or data.get("user") or data
-            stats = data.get("stats") or {}
+            user_data = payload.data or payload.user or payload
+            stats = payload.stats or TikTokStats()
             
-            if not user_data.get("uniqueId"):
+            if not user_data.uniqueId:
                 return None
             
-            return {
+            return ProfileRecord({
                 "platform": "TikTok",
-                "account_id": user_data.get("id") or user_data.get("uid", "N/A"),
-                "username": user_data.get("uniqueId"),
-                "full_name": user_data.get("nickname") or "N/A",
-                "followers": user_data.get("followerCount") or stats.get("followerCount", 0),
-                "following": user_data.get("followingCount") or stats.get("followingCount", 0),
-                "bio": user_data.get("signature", ""),
-                "full_location": user_data.get("region", "N/A"),
-                "posts_count": user_data.get("videoCount") or stats.get("videoCount", 0),
-                "likes": user_data.get("heartCount") or stats.get("heartCount", 0),
-                "is_verified": user_data.get("verified", False),
-                "is_public": not user_data.get("privateAccount", False),
-                "is_business_account": user_data.get("businessAccountStatus", False),
-                "external_url": user_data.get("bioLink", {}).get("link", "N/A") if user_data.get("bioLink") else "N/A",
-                "profile_pic": user_data.get("avatarLarger", "N/A"),
+                "account_id": user_data.id or user_data.uid or "N/A",
+                "username": user_data.uniqueId,
+                "full_name": user_data.nickname or "N/A",
+                "followers": user_data.followerCount or stats.followerCount or 0,
+                "following": user_data.followingCount or stats.followingCount or 0,
+                "bio": user_data.signature or "",
+                "full_location": user_data.region or "N/A",
+                "posts_count": user_data.videoCount or stats.videoCount or 0,
+                "likes": user_data.heartCount or stats.heartCount or 0,
+                "is_verified": user_data.verified or False,
+                "is_public": not user_data.privateAccount,
+                "is_business_account": user_data.businessAccountStatus or False,
+                "external_url": user_data.bioLink.get("link", "N/A") if user_data.bioLink else "N/A",
+                "profile_pic": user_data.avatarLarger or "N/A",
                 "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            })
         except:
             return None
-    
-    def _cache_get(self, key):
-        if key in self._cache:
-            cached_data, timestamp = self._cache[key]
-            if time.time() - timestamp < self._cache_ttl:
-                return cached_data
-            else:
-                del self._cache[key]
-        return None
-    
-    def _cache_set(self, key, data):
-        self._cache[key] = (data, time.time())
@@ -4,13 +4,16 @@ TikTok OSINT Scraper Module
 Comprehensive TikTok user analysis with advanced features
 """
 
-import requests
-import json
-import re
 import os
-import time
 from bs4 import BeautifulSoup
 from datetime import datetime
+from http_session import get_session
+import json_codec
+from tiktok_html import read_profile_state, scan_profile_fields
+from bio_enrichment import enrich_bio, extract_socials, extract_contacts, extract_hashtags, extract_location
+from profile_cache import profile_cache, cache_key
+from profile_record import ProfileRecord
+from history_stats import engagement_rate
 
 class TikTokScraper:
     def __init__(self):
@@ -25,8 +28,7 @@ class TikTokScraper:
             "Upgrade-Insecure-Requests": "1",
             "Referer": "https://www.tiktok.com/"
         }
-        self._cache = {}
-        self._cache_ttl = 86400  # 24 hours
+        self._cache = profile_cache
     
     def get_user_info(self, username):
         """Get TikTok user info with comprehensive analysis"""
@@ -34,7 +36,7 @@ class TikTokScraper:
             username = username.lstrip('@')
             
             # Check cache first
-            cached = self._cache_get(f"tiktok:{username}")
+            cached = self._cache.get(cache_key("tiktok", username, "web"))
             if cached:
                 return cached
             
@@ -43,7 +45,7 @@ class TikTokScraper:
             if info and "error" not in info:
                 # Add analysis
                 info = self._enhance_info(info, username)
-                self._cache_set(f"tiktok:{username}", info)
+                self._cache.set(cache_key("tiktok", username, "web"), info)
                 return info
             
             # Fallback to API
@@ -51,7 +53,7 @@ class TikTokScraper:
                 info = self._api_scrape(username)
                 if info and "error" not in info:
                     info = self._enhance_info(info, username)
-                    self._cache_set(f"tiktok:{username}", info)
+                    self._cache.set(cache_key("tiktok", username, "web"), info)
                     return info
             
             return {"error": "❌ Could not fetch TikTok user info. User may not exist."}
@@ -59,68 +61,46 @@ class TikTokScraper:
         except Exception as e:
             return {"error": f"❌ TikTok error: {str(e)[:100]}"}
     
-    def _cache_get(self, key):
-        """Retrieve from cache if fresh"""
-        if key in self._cache:
-            cached_data, timestamp = self._cache[key]
-            if time.time() - timestamp < self._cache_ttl:
-                return cached_data
-            else:
-                del self._cache[key]
-        return None
-    
-    def _cache_set(self, key, data):
-        """Store in cache with timestamp"""
-        self._cache[key] = (data, time.time())
-    
     def _web_scrape(self, username):
         """Scrape TikTok profile via web"""
         try:
             url = f"https://www.tiktok.com/@{username}"
-            r = requests.get(url, headers=self.headers, timeout=15)
+            r = get_session().get(url, headers=self.headers, timeout=15, stream=True)
             
             if r.status_code == 404:
+                r.close()
                 return {"error": "❌ TikTok user not found"}
             if r.status_code != 200:
+                r.close()
                 return None
             
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            # Try SIGI_STATE script
-            script = soup.find("script", id="SIGI_STATE")
-            if script:
+            # Stream the page only until the embedded state JSON is complete
+            user, stat, page = read_profile_state(r)
+            if user:
                 try:
-                    data = json.loads(script.string)
-                    users = data.get("UserModule", {}).get("users", {})
-                    stats = data.get("UserModule", {}).get("stats", {})
-                    
-                    if users:
-                        user = list(users.values())[0]
-                        stat = list(stats.values())[0] if stats else {}
-                        
-                        return {
-                            "platform": "TikTok",
-                            "username": user.get("uniqueId"),
-                            "full_name": user.get("nickname", "N/A"),
-                            "followers": stat.get("followerCount", 0),
-                            "following": stat.get("followingCount", 0),
-                            "bio": user.get("signature", ""),
-                            "full_location": user.get("region", "N/A"),
-                            "posts_count": stat.get("videoCount", 0),
-                            "likes": stat.get("heartCount", 0),
-                            "is_verified": user.get("verified", False),
-                            "is_public": not user.get("privateAccount", False),
-                            "is_business_account": user.get("businessAccountStatus", False),
-                            "external_url": user.get("bioLink", {}).get("link", "N/A") if user.get("bioLink") else "N/A",
-                            "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }
+                    return ProfileRecord({
+                        "platform": "TikTok",
+                        "username": user.get("uniqueId"),
+                        "full_name": user.get("nickname", "N/A"),
+                        "followers": stat.get("followerCount", 0),
+                        "following": stat.get("followingCount", 0),
+                        "bio": user.get("signature", ""),
+                        "full_location": user.get("region", "N/A"),
+                        "posts_count": stat.get("videoCount", 0),
+                        "likes": stat.get("heartCount", 0),
+                        "is_verified": user.get("verified", False),
+                        "is_public": not user.get("privateAccount", False),
+                        "is_business_account": user.get("businessAccountStatus", False),
+                        "external_url": user.get("bioLink", {}).get("link", "N/A") if user.get("bioLink") else "N/A",
+                        "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    })
                 except:
                     pass
             
-            # Fallback: parse from meta tags
-            meta_data = self._parse_meta_tags(soup)
+            # Fallback: parse from meta tags (only pages without a state script get a full parse)
+            meta_data = self._parse_meta_tags(BeautifulSoup(page, "html.parser"))
             if meta_data.get('username'):
-                return {
+                return ProfileRecord({
                     "platform": "TikTok",
                     "username": meta_data.get('username'),
                     "full_name": meta_data.get('full_name', 'N/A'),
@@ -135,7 +115,7 @@ class TikTokScraper:
                     "is_business_account": False,
                     "external_url": "N/A",
                     "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                })
             
             return None
         except:
@@ -148,30 +128,8 @@ class TikTokScraper:
         
         for script in scripts:
             if script.string and '"uniqueId"' in script.string:
-                try:
-                    match = re.search(r'"uniqueId":"([^"]+)"', script.string)
-                    if match:
-                        meta_data['username'] = match.group(1)
-                    match = re.search(r'"nickname":"([^"]+)"', script.string)
-                    if match:
-                        meta_data['full_name'] = match.group(1)
-                    match = re.search(r'"followerCount":(\d+)', script.string)
-                    if match:
-                        meta_data['followers'] = int(match.group(1))
-                    match = re.search(r'"followingCount":(\d+)', script.string)
-                    if match:
-                        meta_data['following'] = int(match.group(1))
-                    match = re.search(r'"heartCount":(\d+)', script.string)
-                    if match:
-                        meta_data['likes'] = int(match.group(1))
-                    match = re.search(r'"videoCount":(\d+)', script.string)
-                    if match:
-                        meta_data['posts'] = int(match.group(1))
-                    match = re.search(r'"verified":([^,}]+)', script.string)
-                    if match:
-                        meta_data['verified'] = match.group(1).lower() == 'true'
-                except:
-                    pass
+                # Precompiled field scan per script (later scripts win, as before)
+                meta_data.update(scan_profile_fields(script.string))
         
         return meta_data
     
@@ -186,15 +144,15 @@ class TikTokScraper:
             }
             params = {"uniqueId": username}
             
-            r = requests.get(url, headers=headers, params=params, timeout=10)
+            r = get_session().get(url, headers=headers, params=params, timeout=10)
             if r.status_code != 200:
                 return None
             
-            data = r.json()
+            data = json_codec.decode_response(r)
             user = data.get("user", {})
             stats = data.get("stats", {})
             
-            return {
+            return ProfileRecord({
                 "platform": "TikTok",
                 "username": user.get("uniqueId"),
                 "full_name": user.get("nickname", "N/A"),
@@ -209,7 +167,7 @@ class TikTokScraper:
                 "is_business_account": False,
                 "external_url": "N/A",
                 "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            })
         except:
             return None
     
@@ -218,24 +176,8 @@ class TikTokScraper:
         if "error" in info:
             return info
         
-        bio = info.get("bio", "")
-        
-        # Extract socials from bio
-        socials = self._extract_socials(bio)
-        info["linked_accounts"] = socials
-        
-        # Extract contacts
-        contacts = self._extract_contacts(bio)
-        info["contacts"] = contacts
-        
-        # Extract hashtags
-        hashtags = self._extract_hashtags(bio, username)
-        info["hashtags"] = hashtags
-        
-        # Extract location from bio
-        location = self._extract_location(bio)
-        if location:
-            info["bio_location"] = location
+        # Socials, contacts, hashtags and location in one enrichment pass
+        info.update(enrich_bio(info.get("bio", ""), username))
         
         # Calculate engagement
         followers = info.get("followers", 0)
@@ -245,75 +187,24 @@ class TikTokScraper:
         
         if posts > 0:
             info["avg_likes_per_post"] = round(likes / posts, 2)
-        if followers > 0 and posts > 0:
-            info["engagement_rate"] = round((likes / (followers * posts) * 100), 2)
+        rate = engagement_rate(likes, followers, posts)
+        if rate is not None:
+            info["engagement_rate"] = round(rate, 2)
         
         return info
     
     def _extract_socials(self, bio):
         """Extract social media links from bio"""
-        socials = {}
-        if not bio:
-            return socials
-        
-        patterns = {
-            'instagram': r'@([a-zA-Z0-9._]{1,30})|instagram\.com/([a-zA-Z0-9._]{1,30})',
-            'youtube': r'youtube\.com/@?([a-zA-Z0-9_-]+)',
-            'twitter': r'twitter\.com/([a-zA-Z0-9_]+)|x\.com/([a-zA-Z0-9_]+)',
-            'snapchat': r'snapchat[\s:]*([a-zA-Z0-9._-]+)',
-            'discord': r'discord(?:\.gg|\.com)?[/\s]*([a-zA-Z0-9]+)',
-            'telegram': r't\.me/([a-zA-Z0-9_]+)|telegram[/\s]*([a-zA-Z0-9_]+)'
-        }
-        
-        for platform, pattern in patterns.items():
-            match = re.search(pattern, bio, re.IGNORECASE)
-            if match:
-                handle = match.group(1) or (match.group(2) if match.lastindex >= 2 else None)
-                if handle:
-                    socials[platform] = handle
-        
-        return socials
+        return extract_socials(bio)
     
     def _extract_contacts(self, bio):
         """Extract email and phone from bio"""
-        contacts = {}
-        if not bio:
-            return contacts
-        
-        email_match = re.search(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', bio)
-        if email_match:
-            contacts['email'] = email_match.group(1)
-        
-        phone_match = re.search(r'(\+?1?\s*[-.\(]?\d{3}[-.\)]?\s*\d{3}[-.]?\d{4}|\+\d{1,3}\s?\d{6,14})', bio)
-        if phone_match:
-            contacts['phone'] = phone_match.group(1)
-        
-        return contacts
+        return extract_contacts(bio)
     
     def _extract_hashtags(self, bio, username=""):
         """Extract hashtags from bio and username"""
-        text = (bio or "") + " " + (username or "")
-        tags = re.findall(r'#([a-zA-Z0-9_]+)', text)
-        return list(set(tags))
+        return extract_hashtags(bio, username)
     
     def _extract_location(self, bio):
         """Extract location from bio"""
-        if not bio:
-            return None
-        
-        patterns = [
-            r'📍\s*([^\n]+)',
-            r'🌍\s*([^\n]+)',
-            r'📌\s*([^\n]+)',
-            r'Location:\s*([^\n,]+)',
-            r'From:\s*([^\n,]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, bio)
-            if match:
-                location = match.group(1).strip()
-                if location and len(location) > 1:
-                    return location
-        
-        return None
+        return extract_location(bio)
@@ -3,13 +3,14 @@
 Improved TikTok Scraper with Better API Support
 """
 
-import requests
-import json
 import re
 import os
-import time
-from bs4 import BeautifulSoup
 from datetime import datetime
+from http_session import get_session
+import json_codec
+from tiktok_html import read_profile_state
+from profile_cache import profile_cache, cache_key
+from profile_record import ProfileRecord
 
 class TikTokScraperImproved:
     def __init__(self):
@@ -17,15 +18,14 @@ class TikTokScraperImproved:
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
-        self._cache = {}
-        self._cache_ttl = 86400
+        self._cache = profile_cache
     
     def get_user_info(self, username):
         """Get TikTok user info with account ID"""
         try:
             username = username.lstrip('@')
             
-            cached = self._cache_get(f"tiktok:{username}")
+            cached = self._cache.get(cache_key("tiktok", username, "improved"))
             if cached:
                 return cached
             
@@ -33,13 +33,13 @@ class TikTokScraperImproved:
             if self.rapidapi_key:
                 info = self._api_scrape_rapidapi(username)
                 if info and "error" not in info:
-                    self._cache_set(f"tiktok:{username}", info)
+                    self._cache.set(cache_key("tiktok", username, "improved"), info)
                     return info
             
             # Fallback to web scrape
             info = self._web_scrape(username)
             if info and "error" not in info:
-                self._cache_set(f"tiktok:{username}", info)
+                self._cache.set(cache_key("tiktok", username, "improved"), info)
                 return info
             
             return {"error": "❌ TikTok user not found or private account"}
@@ -47,18 +47,6 @@ class TikTokScraperImproved:
         except Exception as e:
             return {"error": f"❌ TikTok error: {str(e)[:100]}"}
     
-    def _cache_get(self, key):
-        if key in self._cache:
-            cached_data, timestamp = self._cache[key]
-            if time.time() - timestamp < self._cache_ttl:
-                return cached_data
-            else:
-                del self._cache[key]
-        return None
-    
-    def _cache_set(self, key, data):
-        self._cache[key] = (data, time.time())
-    
     def _api_scrape_rapidapi(self, username):
         """Use RapidAPI TikTok endpoint"""
         try:
@@ -71,10 +59,10 @@ class TikTokScraperImproved:
             }
             params = {"uniqueId": username}
             
-            r = requests.get(url, headers=headers, params=params, timeout=12)
+            r = get_session().get(url, headers=headers, params=params, timeout=12)
             
             if r.status_code == 200:
-                data = r.json()
+                data = json_codec.decode_response(r)
                 if data.get("data") or data.get("user"):
                     return self._parse_api_response(data)
             
@@ -100,7 +88,7 @@ class TikTokScraperImproved:
                 "N/A"
             )
             
-            result = {
+            result = ProfileRecord({
                 "platform": "TikTok",
                 "account_id": str(account_id),  # ✅ NEW: Account ID
                 "username": user_data.get("uniqueId") or user_data.get("name"),
@@ -116,7 +104,7 @@ class TikTokScraperImproved:
                 "is_business_account": user_data.get("businessAccountStatus") or False,
                 "external_url": user_data.get("bioLink", {}).get("link") or "N/A" if user_data.get("bioLink") else "N/A",
                 "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            })
             
             return result if result.get("username") else None
         except:
@@ -126,44 +114,37 @@ class TikTokScraperImproved:
         """Fallback web scraping"""
         try:
             url = f"https://www.tiktok.com/@{username}"
-            r = requests.get(url, headers=self.headers, timeout=15)
+            r = get_session().get(url, headers=self.headers, timeout=15, stream=True)
             
             if r.status_code == 404:
+                r.close()
                 return {"error": "❌ TikTok user not found"}
             if r.status_code != 200:
+                r.close()
                 return None
             
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            # Extract SIGI_STATE
-            script = soup.find("script", id="SIGI_STATE")
-            if script:
+            # Stream the page only until the embedded state JSON is complete
+            # (no meta-tag fallback here, so nothing after it is read or kept)
+            user, stat, _ = read_profile_state(r, keep_page=False)
+            if user:
                 try:
-                    data = json.loads(script.string)
-                    users = data.get("UserModule", {}).get("users", {})
-                    stats = data.get("UserModule", {}).get("stats", {})
-                    
-                    if users:
-                        user = list(users.values())[0]
-                        stat = list(stats.values())[0] if stats else {}
-                        
-                        return {
-                            "platform": "TikTok",
-                            "account_id": user.get("id", "N/A"),  # ✅ NEW: Account ID from web scrape
-                            "username": user.get("uniqueId"),
-                            "full_name": user.get("nickname", "N/A"),
-                            "followers": stat.get("followerCount", 0),
-                            "following": stat.get("followingCount", 0),
-                            "bio": user.get("signature", ""),
-                            "full_location": user.get("region", "N/A"),
-                            "posts_count": stat.get("videoCount", 0),
-                            "likes": stat.get("heartCount", 0),
-                            "is_verified": user.get("verified", False),
-                            "is_public": not user.get("privateAccount", False),
-                            "is_business_account": user.get("businessAccountStatus", False),
-                            "external_url": user.get("bioLink", {}).get("link", "N/A") if user.get("bioLink") else "N/A",
-                            "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }
+                    return ProfileRecord({
+                        "platform": "TikTok",
+                        "account_id": user.get("id", "N/A"),  # ✅ NEW: Account ID from web scrape
+                        "username": user.get("uniqueId"),
+                        "full_name": user.get("nickname", "N/A"),
+                        "followers": stat.get("followerCount", 0),
+                        "following": stat.get("followingCount", 0),
+                        "bio": user.get("signature", ""),
+                        "full_location": user.get("region", "N/A"),
+                        "posts_count": stat.get("videoCount", 0),
+                        "likes": stat.get("heartCount", 0),
+                        "is_verified": user.get("verified", False),
+                        "is_public": not user.get("privateAccount", False),
+                        "is_business_account": user.get("businessAccountStatus", False),
+                        "external_url": user.get("bioLink", {}).get("link", "N/A") if user.get("bioLink") else "N/A",
+                        "search_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    })
                 except:
                     pass
             